@@ -0,0 +1,387 @@
+# src/primitive_db/bench.py
+"""
+Бенчмарк основных операций на синтетической таблице:
+
+    python -m primitive_db.bench --rows 100000 --output bench.json
+    python -m primitive_db.bench --compare bench.json
+
+Запускается отдельным процессом во временном каталоге: пути к файлам
+базы вычисляются от текущего каталога при импорте модулей пакета,
+поэтому они импортируются только после перехода в этот каталог.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from itertools import islice
+from pathlib import Path
+
+DEFAULT_SCHEMA = "name:str,age:int,active:bool"
+# число различных строк в строковых столбцах (как у реальных справочников)
+STRING_CARDINALITY = 1000
+# целевое время запуска CLI с одной командой (python -m primitive_db.main -c ...)
+STARTUP_TARGET_MS = 150
+STARTUP_COMMAND = "list_tables"
+
+
+def summarize(samples, items=1):
+    """
+    Сводка по замерам (секунды): перцентили задержки в мс
+    и пропускная способность (items элементов на замер в секунду).
+    """
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def percentile(share):
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "total_s": round(total, 6),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "p50_ms": round(percentile(0.50), 4),
+        "p95_ms": round(percentile(0.95), 4),
+        "p99_ms": round(percentile(0.99), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "per_s": round(len(ordered) * items / total, 1) if total else None,
+    }
+
+
+def timed(func, *args, **kwargs):
+    """Время выполнения func(*args, **kwargs) в секундах."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def parse_schema(schema_str):
+    """'name:str,age:int' -> [('name', 'str'), ('age', 'int')]"""
+    columns = []
+    for part in schema_str.split(","):
+        name, _, type_ = part.strip().partition(":")
+        if type_ not in ("str", "int", "bool"):
+            raise ValueError(f"неподдерживаемый тип столбца '{part}'")
+        columns.append((name, type_))
+    return columns
+
+
+def random_literal(type_, rng):
+    """Случайное значение столбца в виде литерала команды."""
+    if type_ == "str":
+        return f'"value{rng.randrange(STRING_CARDINALITY)}"'
+    if type_ == "int":
+        return str(rng.randrange(1000))
+    return rng.choice(("true", "false"))
+
+
+class Benchmark:
+    """
+    Набор замеров: каждая операция выполняется через execute_command
+    (разбор, выполнение, сброс на диск, вывод) или напрямую через
+    функции core/utils, если нужно измерить одну стадию.
+    """
+
+    def __init__(self, rows, ops, repeat, batch, columns, fmt, seed, startup,
+                 scan_workers):
+        from .decorators import set_auto_confirm
+        from .engine import execute_command
+        from .session import TableManager
+
+        set_auto_confirm(True)
+        self.rows = rows
+        self.ops = ops
+        self.repeat = repeat
+        self.batch = batch
+        self.columns = columns
+        self.fmt = fmt
+        self.startup = startup
+        self.scan_workers = scan_workers
+        self.rng = random.Random(seed)
+        self.session = TableManager()
+        self._execute = execute_command
+        self.results = {}
+
+    def execute(self, command):
+        """Выполняет команду со сбросом на диск; вывод отбрасывается."""
+        with redirect_stdout(io.StringIO()):
+            self._execute(command, self.session)
+            self.session.after_command()
+
+    def row_literal(self):
+        return "(" + ", ".join(random_literal(type_, self.rng)
+                               for _, type_ in self.columns) + ")"
+
+    def random_id(self):
+        return self.rng.randrange(1, self.rows + 1)
+
+    def run(self):
+        """Выполняет все замеры и возвращает результаты."""
+        schema = " ".join(f"{name}:{type_}" for name, type_ in self.columns)
+        self.execute(f"create_table t {schema}")
+        if self.fmt != "json":
+            self.execute(f"convert_table t {self.fmt}")
+
+        self.bench_insert_bulk()
+        self.bench_insert()
+        self.bench_select_id()
+        self.bench_scans()
+        self.bench_parallel_scan()
+        self.bench_update()
+        self.bench_delete()
+        self.bench_save_load()
+        self.bench_render()
+        self.bench_startup()
+        return self.results
+
+    def bench_insert_bulk(self):
+        samples = []
+        for start in range(0, self.rows, self.batch):
+            count = min(self.batch, self.rows - start)
+            command = ("insert into t values " +
+                       ", ".join(self.row_literal() for _ in range(count)))
+            samples.append(timed(self.execute, command))
+        self.results["insert_bulk"] = summarize(samples, self.batch)
+
+    def bench_insert(self):
+        samples = [timed(self.execute, f"insert into t values {self.row_literal()}")
+                   for _ in range(self.ops)]
+        self.results["insert"] = summarize(samples)
+
+    def bench_select_id(self):
+        samples = [timed(self.execute, f"select from t where ID = {self.random_id()}")
+                   for _ in range(self.ops)]
+        self.results["select_id"] = summarize(samples)
+
+    def bench_scans(self):
+        from .core import select
+        from .parser import where_clause_parser
+
+        table_data, indexes = self.session.get_table("t")
+        name, type_ = next((column for column in self.columns
+                            if column[1] == "int"), self.columns[0])
+        operator = ">" if type_ == "int" else "="
+
+        with redirect_stdout(io.StringIO()):
+            self.results["select_all"] = summarize(
+                [timed(select, table_data, None, indexes)
+                 for _ in range(self.repeat)], len(table_data))
+
+            samples = []
+            for _ in range(self.repeat):
+                literal = random_literal(type_, self.rng)
+                where = where_clause_parser(f"{name} {operator} {literal}")
+                samples.append(timed(select, table_data, where, indexes))
+            self.results["select_where"] = summarize(samples, len(table_data))
+
+    def bench_parallel_scan(self):
+        """
+        Один и тот же проход с условием в текущем процессе (scan_serial)
+        и в scan_workers процессах без порога по размеру (scan_parallel).
+        """
+        from .core import select
+        from .parser import where_clause_parser
+        from .scan import (
+            scan_workers,
+            set_scan_threshold,
+            set_scan_workers,
+            shutdown_pool,
+        )
+
+        table_data, indexes = self.session.get_table("t")
+        name, type_ = next((column for column in self.columns
+                            if column[1] == "int"), self.columns[0])
+        operator = ">" if type_ == "int" else "="
+        where = where_clause_parser(f"{name} {operator} " +
+                                    random_literal(type_, self.rng))
+
+        set_scan_threshold(0)
+        try:
+            with redirect_stdout(io.StringIO()):
+                for op, workers in (("scan_serial", 1),
+                                    ("scan_parallel", self.scan_workers)):
+                    set_scan_workers(workers)
+                    if op == "scan_parallel" and scan_workers() < 2:
+                        continue
+                    select(table_data, where, indexes)  # запуск пула процессов
+                    stats = summarize([timed(select, table_data, where, indexes)
+                                       for _ in range(self.repeat)], len(table_data))
+                    stats["workers"] = scan_workers()
+                    self.results[op] = stats
+        finally:
+            shutdown_pool()
+
+    def bench_update(self):
+        name, type_ = self.columns[-1]
+        samples = [timed(self.execute,
+                         f"update t set {name} = {random_literal(type_, self.rng)} " +
+                         f"where ID = {self.random_id()}")
+                   for _ in range(self.ops)]
+        self.results["update"] = summarize(samples)
+
+    def bench_delete(self):
+        samples = [timed(self.execute, f"delete from t where ID = {self.random_id()}")
+                   for _ in range(self.ops)]
+        self.results["delete"] = summarize(samples)
+
+    def bench_save_load(self):
+        from .constants import DATA_DIR
+        from .utils import load_table, save_table_data
+
+        table_data, _ = self.session.get_table("t")
+        schema = self.session.metadata["t"]
+        with redirect_stdout(io.StringIO()):
+            self.results["save"] = summarize(
+                [timed(save_table_data, "t_bench", table_data, DATA_DIR, self.fmt)
+                 for _ in range(self.repeat)], len(table_data))
+            self.results["load"] = summarize(
+                [timed(load_table, "t_bench", schema, DATA_DIR, self.fmt)
+                 for _ in range(self.repeat)], len(table_data))
+
+    def bench_render(self, rows=1000):
+        from .core import pretty_table_pages, tsv_pages
+
+        table_data, _ = self.session.get_table("t")
+        schema = self.session.metadata["t"]
+        page = list(islice(table_data, rows))
+
+        for op, pages in (("render", pretty_table_pages), ("render_tsv", tsv_pages)):
+            def render():
+                for _ in pages(page, schema):
+                    pass
+
+            self.results[op] = summarize([timed(render)
+                                          for _ in range(self.repeat)], len(page))
+
+    def bench_startup(self):
+        """
+        Запуск CLI отдельным процессом с одной командой: импорт модулей,
+        разбор аргументов, загрузка метаданных и выполнение команды.
+        """
+        if not self.startup:
+            return
+        env = dict(os.environ)
+        package_root = str(Path(__file__).resolve().parent.parent)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root,
+                                                          env.get("PYTHONPATH")]))
+        command = [sys.executable, "-m", "primitive_db.main", "-q",
+                   "-c", STARTUP_COMMAND]
+
+        samples = [timed(subprocess.run, command, env=env,
+                         stdout=subprocess.DEVNULL, check=True)
+                   for _ in range(self.startup)]
+        stats = summarize(samples)
+        stats["target_ms"] = STARTUP_TARGET_MS
+        stats["within_target"] = stats["p50_ms"] <= STARTUP_TARGET_MS
+        self.results["startup"] = stats
+
+
+def compare(results, baseline):
+    """
+    Сравнение с прошлым запуском: изменение p50 и пропускной способности
+    по каждой операции (в процентах; для p50 рост - это замедление).
+    """
+    lines = []
+    for op, stats in results.items():
+        old = baseline.get(op)
+        if old is None:
+            continue
+        p50 = (stats["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0.0
+        per_s = ((stats["per_s"] / old["per_s"] - 1) * 100
+                 if old.get("per_s") and stats.get("per_s") else 0.0)
+        lines.append(f"{op:<14} p50 {old['p50_ms']:>10.3f} -> " +
+                     f"{stats['p50_ms']:>10.3f} мс ({p50:+.1f}%), " +
+                     f"пропускная способность {per_s:+.1f}%")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        prog="python -m primitive_db.bench",
+        description="Бенчмарк основных операций базы данных.")
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="число кортежей в таблице (по умолчанию 100000)")
+    parser.add_argument("--ops", type=int, default=500,
+                        help="число одиночных операций insert/select/update/delete")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="повторы для проходов по всей таблице, save/load, render")
+    parser.add_argument("--batch", type=int, default=1000,
+                        help="кортежей в одном многострочном insert")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA,
+                        help=f"столбцы таблицы (по умолчанию {DEFAULT_SCHEMA})")
+    parser.add_argument("--format", default="json", choices=["json", "binary"],
+                        help="формат хранения таблицы")
+    parser.add_argument("--startup", type=int, default=10,
+                        help="запусков CLI для замера времени старта (0 - не замерять)")
+    parser.add_argument("--scan-workers", type=int, default=0,
+                        help="процессов для scan_parallel (0 - по числу ядер)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="начальное значение генератора данных")
+    parser.add_argument("--output", help="записать результаты в JSON-файл")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="сравнить с результатами прошлого запуска")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Точка входа бенчмарка."""
+    args = parse_args(argv)
+    if args.rows < 1 or args.ops < 1 or args.repeat < 1 or args.batch < 1:
+        print("Ошибка: --rows, --ops, --repeat и --batch должны быть положительными.")
+        return 1
+    if args.startup < 0 or args.scan_workers < 0:
+        print("Ошибка: --startup и --scan-workers не могут быть отрицательными.")
+        return 1
+    columns = parse_schema(args.schema)
+
+    cwd = Path.cwd()
+    workdir = Path(tempfile.mkdtemp(prefix="primitive_db_bench_"))
+    os.chdir(workdir)
+    try:
+        from .constants import METADATA_FILE
+        if not METADATA_FILE.is_relative_to(workdir):
+            print("Ошибка: бенчмарк нужно запускать отдельным процессом " +
+                  "(python -m primitive_db.bench), иначе он затронет рабочую базу.")
+            return 1
+
+        started = time.perf_counter()
+        results = Benchmark(args.rows, args.ops, args.repeat, args.batch,
+                            columns, args.format, args.seed, args.startup,
+                            args.scan_workers).run()
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"rows": args.rows, "ops": args.ops, "repeat": args.repeat,
+                       "batch": args.batch, "schema": args.schema,
+                       "format": args.format, "seed": args.seed,
+                       "startup": args.startup,
+                       "scan_workers": args.scan_workers},
+            "duration_s": round(time.perf_counter() - started, 3),
+            "results": results,
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            print(compare(results, json.load(file)["results"]))
+    elif not args.output:
+        json.dump(report, sys.stdout, indent=4, ensure_ascii=False)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
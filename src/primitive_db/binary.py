@@ -0,0 +1,208 @@
+# src/primitive_db/binary.py
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from .columnar import (
+    BoolColumn,
+    ColumnarTable,
+    IntColumn,
+    ObjectColumn,
+    StrColumn,
+)
+from .fileio import atomic_write
+
+# формат файла: MAGIC, длина заголовка (<Q), заголовок JSON,
+# затем сегменты столбцов, выровненные по 8 байт
+MAGIC = b"PDBCOL1\n"
+HEADER_LENGTH = struct.Struct("<Q")
+ALIGNMENT = 8
+
+
+def _padding(offset):
+    return -offset % ALIGNMENT
+
+
+def _column_segments(column):
+    """
+    Разбивает столбец на (вид, сегменты) для записи на диск.
+    """
+    if isinstance(column, BoolColumn):
+        return "bool", [column.data]
+    if isinstance(column, IntColumn):
+        return "int", [column.data]
+    if isinstance(column, StrColumn):
+        codes, strings = column.compacted()
+        strings = json.dumps(strings, ensure_ascii=False).encode("utf-8")
+        return "str", [codes, strings]
+    return "object", [json.dumps(column.data, ensure_ascii=False).encode("utf-8")]
+
+
+def save_binary_table(filepath, table):
+    """
+    Сохраняет таблицу в бинарном столбцовом формате.
+    Пишет во временный файл и подменяет им старый, поэтому открытые
+    через mmap копии старого файла остаются корректными.
+    """
+    if not isinstance(table, ColumnarTable):
+        raise TypeError("бинарный формат поддерживает только столбцовые таблицы")
+
+    columns = {}
+    segments = []
+    for name in table.names:
+        kind, column_segments = _column_segments(table.columns[name])
+        columns[name] = {"kind": kind, "segments": []}
+        for segment in column_segments:
+            segment = memoryview(segment).cast("B")
+            columns[name]["segments"].append(len(segment))
+            segments.append(segment)
+
+    header = {
+        "rows": len(table),
+        "schema": table.schema,
+        "byteorder": sys.byteorder,
+        "columns": columns,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    with atomic_write(filepath, "snapshot", binary=True) as file:
+        file.write(MAGIC)
+        file.write(HEADER_LENGTH.pack(len(header_bytes)))
+        file.write(header_bytes)
+        offset = len(MAGIC) + HEADER_LENGTH.size + len(header_bytes)
+        for segment in segments:
+            file.write(b"\0" * _padding(offset))
+            offset += _padding(offset)
+            file.write(segment)
+            offset += len(segment)
+
+
+class _LazyColumns(Mapping):
+    """
+    Столбцы отображенного файла. Столбец разбирается при первом
+    обращении, поэтому запрос читает только нужные страницы.
+    """
+
+    def __init__(self, buffer, layout, swap_bytes):
+        self.buffer = buffer
+        self.layout = layout
+        self.swap_bytes = swap_bytes
+        self.loaded = {}
+
+    def __getitem__(self, name):
+        column = self.loaded.get(name)
+        if column is None:
+            column = self._load(name)
+            self.loaded[name] = column
+        return column
+
+    def __contains__(self, name):
+        return name in self.layout
+
+    def __iter__(self):
+        return iter(self.layout)
+
+    def __len__(self):
+        return len(self.layout)
+
+    def _typed(self, segment, typecode):
+        if not self.swap_bytes:
+            return segment.cast(typecode)
+        # порядок байт файла не совпадает с текущим - нужна копия
+        data = array(typecode)
+        data.frombytes(segment)
+        data.byteswap()
+        return data
+
+    def _load(self, name):
+        kind, segments = self.layout[name]
+        if kind == "int":
+            column = IntColumn.__new__(IntColumn)
+            column.data = self._typed(segments[0], "q")
+        elif kind == "bool":
+            column = BoolColumn.__new__(BoolColumn)
+            column.data = self._typed(segments[0], "b")
+        elif kind == "str":
+            column = StrColumn.__new__(StrColumn)
+            column.codes = self._typed(segments[0], "i")
+            column.strings = [sys.intern(string) for string
+                              in json.loads(bytes(segments[1]).decode("utf-8"))]
+            column.lookup = {string: code for code, string
+                             in enumerate(column.strings)}
+        else:
+            column = ObjectColumn(json.loads(bytes(segments[0]).decode("utf-8")))
+        return column
+
+
+class MappedTable(ColumnarTable):
+    """
+    Таблица, открытая из бинарного файла через mmap (только чтение).
+    Для изменений ее нужно перевести в память через to_columnar().
+    """
+
+    def __init__(self, filepath):
+        with open(filepath, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self.mmap)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"файл '{filepath}' не является бинарной таблицей")
+
+        offset = len(MAGIC)
+        (header_length,) = HEADER_LENGTH.unpack_from(buffer, offset)
+        offset += HEADER_LENGTH.size
+        header = json.loads(bytes(buffer[offset:offset + header_length]))
+        offset += header_length
+
+        layout = {}
+        for name, column in header["columns"].items():
+            segments = []
+            for length in column["segments"]:
+                offset += _padding(offset)
+                segments.append(buffer[offset:offset + length])
+                offset += length
+            layout[name] = (column["kind"], segments)
+
+        self.schema = header["schema"]
+        self.names = list(self.schema)
+        self.length = header["rows"]
+        self.columns = _LazyColumns(buffer, layout,
+                                    header["byteorder"] != sys.byteorder)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("таблица открыта только для чтения")
+
+    append = extend = set_value = delete = _read_only
+
+    def to_columnar(self):
+        """
+        Копирует таблицу в изменяемую ColumnarTable.
+        """
+        table = ColumnarTable(self.schema)
+        for name in self.names:
+            column = self.columns[name]
+            if isinstance(column, StrColumn):
+                copy = StrColumn.__new__(StrColumn)
+                copy.codes = array("i")
+                copy.codes.frombytes(memoryview(column.codes).cast("B"))
+                copy.strings = list(column.strings)
+                copy.lookup = dict(column.lookup)
+            elif isinstance(column, IntColumn):
+                copy = type(column).__new__(type(column))
+                copy.data = array(column.typecode)
+                copy.data.frombytes(memoryview(column.data).cast("B"))
+            else:
+                copy = ObjectColumn(column.data)
+            table.columns[name] = copy
+        table.length = self.length
+        return table
+
+
+def open_binary_table(filepath):
+    """
+    Открывает бинарную таблицу без чтения данных в память.
+    """
+    return MappedTable(filepath)
@@ -0,0 +1,106 @@
+# src/primitive_db/cache.py
+import sys
+from collections import OrderedDict
+
+from .constants import CACHE_MAX_BYTES, CACHE_MAX_ENTRIES
+from .metrics import log
+
+
+def estimate_size(value):
+    """
+    Приблизительный размер результата запроса в байтах.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, list):
+        size += sum(sys.getsizeof(row) for row in value)
+    return size
+
+
+class QueryCache:
+    """
+    Кэш результатов SELECT с вытеснением LRU, ограничением по числу
+    записей и примерному объему, а также инвалидацией по таблице.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # (таблица, ключ) -> (версия таблицы, результат, размер)
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __call__(self, table_name, key, value_func):
+        """
+        Возвращает результат из кэша или вычисляет и кэширует его.
+        """
+        cache_key = (table_name, key)
+        version = self.versions.get(table_name, 0)
+        entry = self.entries.get(cache_key)
+
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            self.entries.move_to_end(cache_key)
+            log(f"Результат получен из кэша: '{table_name}_{key}'")
+            return entry[1]
+
+        self.misses += 1
+        log(f"Вычисление и кэширование: '{table_name}_{key}'")
+        result = value_func()
+        if result is not None:
+            self._store(cache_key, version, result)
+        return result
+
+    def _store(self, cache_key, version, result):
+        self._discard(cache_key)
+
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            # результат больше всего бюджета - не кэшируем
+            return
+
+        self.entries[cache_key] = (version, result, size)
+        self.total_bytes += size
+
+        while (len(self.entries) > self.max_entries
+               or self.total_bytes > self.max_bytes):
+            oldest_key = next(iter(self.entries))
+            self._discard(oldest_key)
+            self.evictions += 1
+
+    def _discard(self, cache_key):
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def invalidate(self, table_name):
+        """
+        Сбрасывает закэшированные результаты только для одной таблицы.
+        """
+        self.versions[table_name] = self.versions.get(table_name, 0) + 1
+        for cache_key in [key for key in self.entries if key[0] == table_name]:
+            self._discard(cache_key)
+        self.invalidations += 1
+
+    def clear(self):
+        """Очищает весь кэш."""
+        self.entries.clear()
+        self.total_bytes = 0
+        log("Кэш очищен.")
+
+    def stats(self):
+        """
+        Статистика работы кэша.
+        """
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
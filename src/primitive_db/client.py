@@ -0,0 +1,87 @@
+# src/primitive_db/client.py
+import json
+import socket
+import sys
+
+from .constants import SERVER_HOST, SERVER_PORT
+
+
+class DatabaseClient:
+    """
+    Клиент сервера базы данных (database serve).
+    Команды отправляются по одной строкой JSON, ответ - тоже строка JSON.
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, unix_socket=None):
+        if unix_socket:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_socket)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile("rwb")
+
+    def execute(self, command, params=None, verbose=False):
+        """
+        Выполняет команду на сервере. params - значения для плейсхолдеров ?,
+        verbose - включить в вывод служебные сообщения (время, кэш).
+        Возвращает ответ сервера: {"ok": ..., "output": ...}.
+        """
+        request = {"command": command}
+        if params is not None:
+            request["params"] = list(params)
+        if verbose:
+            request["verbose"] = True
+        request_line = json.dumps(request, ensure_ascii=False) + "\n"
+        self.file.write(request_line.encode("utf-8"))
+        self.file.flush()
+
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("сервер закрыл соединение")
+        return json.loads(line)
+
+    def close(self):
+        """Закрывает соединение."""
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_client(commands=None, host=SERVER_HOST, port=SERVER_PORT, unix_socket=None,
+               verbose=False):
+    """
+    Выполняет команды на сервере и выводит ответы.
+    Без списка команд читает их построчно со стандартного ввода.
+    verbose - запрашивать у сервера служебные сообщения.
+    Возвращает код завершения: 1, если какая-то команда завершилась ошибкой.
+    """
+    interactive = commands is None and sys.stdin.isatty()
+    if commands is None:
+        commands = sys.stdin
+
+    failed = False
+    try:
+        client = DatabaseClient(host, port, unix_socket)
+    except OSError as e:
+        print(f"Ошибка: не удалось подключиться к серверу: '{e}'")
+        return 1
+
+    with client:
+        if interactive:
+            print(">>> ", end="", flush=True)
+        for command in commands:
+            command = command.strip().removesuffix(";").strip()
+            if command and not command.startswith(("#", "--")):
+                response = client.execute(command, verbose=verbose)
+                print(response["output"], end="")
+                failed = failed or not response["ok"]
+                if response.get("close"):
+                    break
+            if interactive:
+                print(">>> ", end="", flush=True)
+    return 1 if failed else 0
@@ -0,0 +1,392 @@
+# src/primitive_db/columnar.py
+import sys
+from array import array
+
+from .constants import DELETE_SHIFT_MAX_RUNS
+
+
+class IntColumn:
+    """
+    Столбец int: значения хранятся в array('q') по 8 байт.
+    """
+
+    typecode = "q"
+
+    def __init__(self, values=()):
+        self.data = array(self.typecode, values)
+
+    def __len__(self):
+        return len(self.data)
+
+    def append(self, value):
+        """Добавляет значение в конец столбца."""
+        self.data.append(value)
+
+    def extend(self, values):
+        """Добавляет значения в конец столбца."""
+        self.data.extend(values)
+
+    def get(self, position):
+        """Значение по позиции."""
+        return self.data[position]
+
+    def set(self, position, value):
+        """Заменяет значение по позиции."""
+        self.data[position] = value
+
+    def keep(self, positions):
+        """Оставляет только значения с заданными позициями."""
+        data = self.data
+        self.data = array(self.typecode, [data[position] for position in positions])
+
+    def remove(self, start, end):
+        """Удаляет значения в диапазоне позиций сдвигом хвоста."""
+        del self.data[start:end]
+
+    def values(self):
+        """Итератор по значениям столбца."""
+        return iter(self.data)
+
+    def slice(self, start, end):
+        """Значения столбца в диапазоне позиций списком."""
+        return self.data[start:end].tolist()
+
+    def nbytes(self):
+        """Объем данных столбца в байтах."""
+        return self.data.itemsize * len(self.data)
+
+
+class BoolColumn(IntColumn):
+    """
+    Столбец bool: значения хранятся в array('b') по 1 байту.
+    """
+
+    typecode = "b"
+
+    def __init__(self, values=()):
+        super().__init__([self._encode(value) for value in values])
+
+    @staticmethod
+    def _encode(value):
+        if not isinstance(value, bool):
+            raise TypeError(f"ожидается bool, получено '{value}'")
+        return int(value)
+
+    def append(self, value):
+        """Добавляет значение в конец столбца."""
+        self.data.append(self._encode(value))
+
+    def extend(self, values):
+        """Добавляет значения в конец столбца."""
+        self.data.extend([self._encode(value) for value in values])
+
+    def get(self, position):
+        """Значение по позиции."""
+        return bool(self.data[position])
+
+    def set(self, position, value):
+        """Заменяет значение по позиции."""
+        self.data[position] = self._encode(value)
+
+    def values(self):
+        """Итератор по значениям столбца."""
+        return map(bool, self.data)
+
+    def slice(self, start, end):
+        """Значения столбца в диапазоне позиций списком."""
+        return [bool(item) for item in self.data[start:end]]
+
+
+class StrColumn:
+    """
+    Столбец str со словарным кодированием: каждая уникальная строка
+    хранится один раз, в столбце лежат только ее коды (array('i')).
+    """
+
+    def __init__(self, values=()):
+        self.codes = array("i")
+        self.strings = []
+        self.lookup = {}
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _encode(self, value):
+        if not isinstance(value, str):
+            raise TypeError(f"ожидается str, получено '{value}'")
+
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(sys.intern(value))
+            self.lookup[value] = code
+        return code
+
+    def append(self, value):
+        """Добавляет значение в конец столбца."""
+        self.codes.append(self._encode(value))
+
+    def extend(self, values):
+        """Добавляет значения в конец столбца."""
+        self.codes.extend([self._encode(value) for value in values])
+
+    def get(self, position):
+        """Значение по позиции."""
+        return self.strings[self.codes[position]]
+
+    def set(self, position, value):
+        """Заменяет значение по позиции."""
+        self.codes[position] = self._encode(value)
+
+    def keep(self, positions):
+        """
+        Оставляет только значения с заданными позициями
+        и перестраивает словарь без неиспользуемых строк.
+        """
+        codes = self.codes
+        self.codes = array("i", [codes[position] for position in positions])
+        codes, strings = self.compacted()
+        if strings is not self.strings:
+            self.codes, self.strings = codes, strings
+            self.lookup = {string: code for code, string in enumerate(strings)}
+
+    def remove(self, start, end):
+        """
+        Удаляет значения в диапазоне позиций сдвигом хвоста кодов.
+        Словарь не перестраивается: неиспользуемые строки отбрасываются
+        при пересборке столбца (keep) и при записи на диск.
+        """
+        del self.codes[start:end]
+
+    def compacted(self):
+        """
+        Коды и словарь без неиспользуемых строк (столбец не меняется).
+        Если лишних строк нет, возвращает текущие коды и словарь.
+        """
+        used = sorted(set(self.codes))
+        if len(used) == len(self.strings):
+            return self.codes, self.strings
+
+        # перенумеровываем коды без декодирования строк
+        remap = {code: new_code for new_code, code in enumerate(used)}
+        strings = [self.strings[code] for code in used]
+        return array("i", [remap[code] for code in self.codes]), strings
+
+    def values(self):
+        """Итератор по значениям столбца."""
+        strings = self.strings
+        return (strings[code] for code in self.codes)
+
+    def slice(self, start, end):
+        """Значения столбца в диапазоне позиций списком."""
+        strings = self.strings
+        return [strings[code] for code in self.codes[start:end]]
+
+    def nbytes(self):
+        """Объем данных столбца в байтах (коды и словарь)."""
+        return (self.codes.itemsize * len(self.codes)
+                + sum(sys.getsizeof(string) for string in self.strings))
+
+
+class ObjectColumn:
+    """
+    Нетипизированный столбец (список). Используется, если данные
+    на диске не соответствуют схеме и не помещаются в типизированный столбец.
+    """
+
+    def __init__(self, values=()):
+        self.data = list(values)
+
+    def __len__(self):
+        return len(self.data)
+
+    def append(self, value):
+        """Добавляет значение в конец столбца."""
+        self.data.append(value)
+
+    def extend(self, values):
+        """Добавляет значения в конец столбца."""
+        self.data.extend(values)
+
+    def get(self, position):
+        """Значение по позиции."""
+        return self.data[position]
+
+    def set(self, position, value):
+        """Заменяет значение по позиции."""
+        self.data[position] = value
+
+    def keep(self, positions):
+        """Оставляет только значения с заданными позициями."""
+        data = self.data
+        self.data = [data[position] for position in positions]
+
+    def remove(self, start, end):
+        """Удаляет значения в диапазоне позиций сдвигом хвоста."""
+        del self.data[start:end]
+
+    def values(self):
+        """Итератор по значениям столбца."""
+        return iter(self.data)
+
+    def slice(self, start, end):
+        """Значения столбца в диапазоне позиций списком."""
+        return self.data[start:end]
+
+    def nbytes(self):
+        """Объем данных столбца в байтах."""
+        return sys.getsizeof(self.data) + sum(sys.getsizeof(v) for v in self.data)
+
+
+COLUMN_TYPES = {
+    "int": IntColumn,
+    "bool": BoolColumn,
+    "str": StrColumn,
+}
+
+
+class ColumnarTable:
+    """
+    Таблица в памяти, хранящая данные по столбцам согласно схеме
+    из db_meta.json. Наружу кортежи отдаются как словари.
+    """
+
+    def __init__(self, schema):
+        self.schema = dict(schema)
+        self.names = list(self.schema)
+        self.columns = {name: COLUMN_TYPES.get(type_, ObjectColumn)()
+                        for name, type_ in self.schema.items()}
+        self.length = 0
+
+    @classmethod
+    def from_rows(cls, schema, rows):
+        """
+        Строит таблицу из списка кортежей-словарей.
+        """
+        table = cls(schema)
+        for name, type_ in table.schema.items():
+            values = [row.get(name) for row in rows]
+            try:
+                table.columns[name] = COLUMN_TYPES.get(type_, ObjectColumn)(values)
+            except (TypeError, OverflowError):
+                # данные не соответствуют типу - храним как есть
+                table.columns[name] = ObjectColumn(values)
+        table.length = len(rows)
+        return table
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        # идем по столбцам параллельно, без обращения по позиции
+        names = self.names
+        for values in zip(*[self.columns[name].values() for name in names]):
+            yield dict(zip(names, values))
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError("позиция за пределами таблицы")
+        return self.row(position)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.nbytes()
+
+    def row(self, position, names=None):
+        """
+        Кортеж по позиции в виде словаря; names - только эти столбцы.
+        """
+        columns = self.columns
+        return {name: columns[name].get(position)
+                for name in (self.names if names is None else names)}
+
+    def value(self, position, name):
+        """Значение столбца по позиции."""
+        return self.columns[name].get(position)
+
+    def column_values(self, name):
+        """Итератор по значениям столбца."""
+        return self.columns[name].values()
+
+    def append(self, row):
+        """
+        Добавляет кортеж в конец таблицы. Возвращает его позицию.
+        """
+        appended = []
+        try:
+            for name in self.names:
+                self.columns[name].append(row.get(name))
+                appended.append(name)
+        except (TypeError, OverflowError):
+            # откатываем частично добавленный кортеж
+            for name in appended:
+                self.columns[name].keep(range(self.length))
+            raise
+
+        self.length += 1
+        return self.length - 1
+
+    def extend(self, rows):
+        """
+        Добавляет пачку кортежей постолбцово. Возвращает позицию первого.
+        """
+        start = self.length
+        extended = []
+        try:
+            for name in self.names:
+                self.columns[name].extend([row.get(name) for row in rows])
+                extended.append(name)
+        except (TypeError, OverflowError):
+            # откатываем частично добавленную пачку
+            for name in [*extended, name]:
+                self.columns[name].keep(range(self.length))
+            raise
+
+        self.length += len(rows)
+        return start
+
+    def value_rows(self, start, end):
+        """
+        Кортежи в диапазоне позиций в виде списков значений
+        (в порядке столбцов схемы) - компактно для журнала.
+        """
+        columns = [self.columns[name].slice(start, end) for name in self.names]
+        return [list(values) for values in zip(*columns)]
+
+    def set_value(self, position, name, value):
+        """Заменяет значение столбца по позиции."""
+        self.columns[name].set(position, value)
+
+    def delete(self, positions):
+        """
+        Удаляет кортежи с заданными позициями. Немногие непрерывные
+        диапазоны удаляются сдвигом хвоста столбцов (без обхода всех
+        значений в Python), иначе столбцы пересобираются.
+        """
+        positions = sorted(set(positions))
+        runs = []
+        for position in positions:
+            if runs and runs[-1][1] == position:
+                runs[-1][1] = position + 1
+            else:
+                runs.append([position, position + 1])
+
+        if len(runs) > DELETE_SHIFT_MAX_RUNS:
+            deleted = set(positions)
+            keep = [position for position in range(self.length)
+                    if position not in deleted]
+            for column in self.columns.values():
+                column.keep(keep)
+        else:
+            # с конца, чтобы позиции следующих диапазонов не сдвигались
+            for start, end in reversed(runs):
+                for column in self.columns.values():
+                    column.remove(start, end)
+        self.length -= len(positions)
+
+    def nbytes(self):
+        """Объем данных таблицы в байтах."""
+        return sum(column.nbytes() for column in self.columns.values())
@@ -3,4 +3,83 @@ from pathlib import Path
 # current work dir
 ALLOWED_DATA_TYPES = {'int', 'str', 'bool'}
 DATA_DIR = Path.cwd() / 'src' / 'primitive_db' / 'data'
-METADATA_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_meta.json'
\ No newline at end of file
+METADATA_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_meta.json'
+INDEX_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_indexes.json'
+SEQUENCE_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_sequences.json'
+STORAGE_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_storage.json'
+TRANSACTION_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_transaction.json'
+WRITER_LOCK_FILE = Path.cwd() / 'src' / 'primitive_db' / 'db_writer.lock'
+
+# форматы хранения таблиц на диске и расширения их файлов
+TABLE_FORMATS = {'json': '.json', 'binary': '.bin'}
+
+# минимальный размер журнала изменений (байт), после которого
+# он сворачивается в снимок таблицы
+LOG_COMPACT_MIN_BYTES = 1024 * 1024
+
+# политика сброса изменений сессии на диск:
+# command - после каждой команды, interval - не чаще FLUSH_INTERVAL_MS,
+# exit - при выходе из программы
+FLUSH_POLICY = 'command'
+FLUSH_INTERVAL_MS = 1000
+
+# режим долговечности записи на диск: always - fsync после каждой записи,
+# commit - только при подмене снимков/конфигураций и фиксации транзакции,
+# never - без fsync
+DURABILITY = 'commit'
+
+# время ожидания блокировки таблицы или записи другим процессом (секунды,
+# None - ждать без ограничения)
+LOCK_TIMEOUT = 10
+
+# удаление из столбцовой таблицы: до стольких непрерывных диапазонов
+# позиций удаляется сдвигом хвоста столбцов, больше - пересборкой столбцов
+DELETE_SHIFT_MAX_RUNS = 64
+
+# ограничения кэша результатов SELECT
+CACHE_MAX_ENTRIES = 128
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# агрегатные функции в SELECT
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+
+# число разобранных шаблонов команд в кэше
+STATEMENT_CACHE_SIZE = 256
+# команды с большим числом литералов (многострочный insert) разбираются
+# напрямую: такой шаблон почти никогда не повторяется
+STATEMENT_CACHE_MAX_LITERALS = 64
+
+# служебные сообщения (время выполнения команд, обращения к кэшу);
+# отключаются флагом -q/--quiet или командой verbose off
+VERBOSE = True
+
+# число последних значений гистограммы метрик для расчета перцентилей
+METRICS_SAMPLES = 10000
+# число строк отчета профилировщика
+PROFILE_TOP = 15
+
+# параллельный проход по таблице без индекса: число процессов
+# (0 - по числу ядер, 1 - всегда последовательно) и минимальный
+# размер таблицы (кортежей), с которого проход распараллеливается
+SCAN_WORKERS = 0
+PARALLEL_SCAN_THRESHOLD = 200000
+# частей таблицы на один процесс (для выравнивания нагрузки)
+SCAN_CHUNKS_PER_WORKER = 4
+
+# формат вывода выборок: table - таблица PrettyTable,
+# tsv - значения через табуляцию (быстрее, для скриптов)
+OUTPUT_FORMATS = ('table', 'tsv')
+OUTPUT_FORMAT = 'table'
+
+# число кортежей на одной странице потокового вывода SELECT
+OUTPUT_PAGE_SIZE = 100
+
+# форматы файлов для import/export и размер пачки при импорте
+TRANSFER_FORMATS = ('.csv', '.jsonl')
+IMPORT_BATCH_SIZE = 10000
+
+# сервер (database serve): адрес по умолчанию и наибольшая длина
+# одной строки запроса (байт)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 5455
+SERVER_MAX_LINE = 16 * 1024 * 1024
@@ -1,7 +1,25 @@
-from prettytable import PrettyTable
-
-from .constants import ALLOWED_DATA_TYPES
+import heapq
+from itertools import islice
+
+from .columnar import (
+    BoolColumn,
+    IntColumn,
+    ObjectColumn,
+    StrColumn,
+)
+from .constants import (
+    ALLOWED_DATA_TYPES,
+    OUTPUT_FORMAT,
+    OUTPUT_FORMATS,
+    OUTPUT_PAGE_SIZE,
+    TABLE_FORMATS,
+)
 from .decorators import confirm_action, handle_db_errors, log_time
+from .indexes import INDEX_TYPES, SortedIndex
+from .metrics import registry
+from .parser import select_label
+from .predicates import compile_test, iter_matching
+from .scan import parallel_scan
 
 
 @handle_db_errors
@@ -54,10 +72,58 @@ def drop_table(metadata, table_name):
                 " Проверьте корректность написания.")
 
     # deleting the table
+    invalidate_schema(metadata[table_name])
     del metadata[table_name]
 
     return metadata, f"Успешно: таблица '{table_name}' удалена."
 
+@handle_db_errors
+def create_index(metadata, index_config, table_name, column, kind="hash"):
+    """
+    Регистрирует индекс по столбцу таблицы.
+    """
+    if table_name not in metadata:
+        return index_config, f"Ошибка: таблицы '{table_name}' не существует."
+
+    if column not in metadata[table_name]:
+        return (index_config, f"Ошибка: столбца '{column}' " +
+                f"нет в таблице '{table_name}'.")
+
+    if column == "ID":
+        return (index_config, "Ошибка: индекс по столбцу 'ID' " +
+                "строится автоматически.")
+
+    if kind not in INDEX_TYPES:
+        return (index_config, f"Ошибка: '{kind}'. " +
+                f"Допустимые типы индексов: {', '.join(sorted(INDEX_TYPES))}.")
+
+    table_indexes = index_config.setdefault(table_name, {})
+    if table_indexes.get(column) == kind:
+        return (index_config, f"Ошибка: индекс '{kind}' по столбцу " +
+                f"'{column}' уже существует.")
+
+    table_indexes[column] = kind
+
+    return (index_config, f"Успешно: индекс '{kind}' по столбцу '{column}' " +
+            f"таблицы '{table_name}' создан.")
+
+@handle_db_errors
+def set_table_format(metadata, storage_config, table_name, fmt):
+    """
+    Задает формат хранения таблицы на диске.
+    """
+    if table_name not in metadata:
+        return storage_config, f"Ошибка: таблицы '{table_name}' не существует."
+
+    if fmt not in TABLE_FORMATS:
+        return (storage_config, f"Ошибка: '{fmt}'. " +
+                f"Допустимые форматы: {', '.join(TABLE_FORMATS)}.")
+
+    storage_config[table_name] = fmt
+
+    return (storage_config, f"Успешно: таблица '{table_name}' " +
+            f"переведена в формат '{fmt}'.")
+
 @handle_db_errors
 def list_tables(metadata):
     """
@@ -69,118 +135,545 @@ def list_tables(metadata):
     return "\n".join([f"- {table}" for table in metadata.keys()])
 
 
-def validate_value(value, expected_type):
+# строковые литералы bool (сравниваются без учета регистра)
+_BOOL_LITERALS = {'true': True, '1': True, 'yes': True,
+                  'false': False, '0': False, 'no': False}
+
+def _to_bool(value):
+    if type(value) is bool:
+        return value
+    if isinstance(value, str):
+        converted = _BOOL_LITERALS.get(value.lower())
+        if converted is not None:
+            return converted
+    raise ValueError(value)
+
+# диапазон столбца int (array('q') - 64-битные целые)
+_INT_MIN, _INT_MAX = -2**63, 2**63 - 1
+
+def _to_int(value):
+    converted = int(value)
+    if not _INT_MIN <= converted <= _INT_MAX:
+        raise ValueError(value)
+    return converted
+
+def _unsupported(value):
+    raise TypeError(value)
+
+# тип столбца -> функция приведения значения (ValueError/TypeError - не подходит);
+# str возвращает строку без копирования
+CONVERTERS = {"int": _to_int, "str": str, "bool": _to_bool}
+
+
+class CompiledSchema:
     """
-    Проверяет соответствие значения ожидаемому типу.
+    Схема таблицы (без ID), скомпилированная в кортеж конвертеров:
+    кортеж значений приводится к типам без разбора типа на каждое значение.
     """
-    match expected_type:
-        case "int":
-            if isinstance(value, int) and not isinstance(value, bool):
-                return True, value
+
+    def __init__(self, table_schema):
+        columns = [(name, type_) for name, type_ in table_schema.items()
+                   if name != "ID"]
+        self.names = tuple(name for name, _ in columns)
+        self.types = tuple(type_ for _, type_ in columns)
+        self.converters = tuple(CONVERTERS.get(type_, _unsupported)
+                                for _, type_ in columns)
+
+    def __len__(self):
+        return len(self.names)
+
+    def convert(self, values, names=None):
+        """
+        Приводит значения к типам столбцов (все или только names).
+        Возвращает (словарь значений, None) или (None, сообщение об ошибке).
+        """
+        if names is None:
+            names, converters = self.names, self.converters
+        else:
+            converters = [self.converters[self.names.index(name)] for name in names]
+
+        try:
+            return {name: convert(value) for name, convert, value
+                    in zip(names, converters, values)}, None
+        except (ValueError, TypeError):
+            pass
+
+        # медленный путь только для сообщения: ищем первое неподходящее значение
+        for name, convert, value in zip(names, converters, values):
             try:
-                return True, int(value)
+                convert(value)
             except (ValueError, TypeError):
-                return False, None
+                type_ = self.types[self.names.index(name)]
+                return None, (f"Ошибка: значение '{value}' не соответствует " +
+                              f"типу '{type_}' для столбца '{name}'")
+        return None, "Ошибка: некорректные значения кортежа."
+
+    def convert_rows(self, rows):
+        """
+        Приводит пачку кортежей значений постолбцово: конвертер столбца
+        применяется через map ко всем его значениям сразу.
+        Возвращает (список словарей, None) или (None, сообщение об ошибке).
+        """
+        if not self.names:
+            return [{} for _ in rows], None
+
+        try:
+            columns = [list(map(convert, values)) for convert, values
+                       in zip(self.converters, zip(*rows))]
+        except (ValueError, TypeError):
+            for values in rows:
+                _, error = self.convert(values)
+                if error:
+                    return None, error
+            return None, "Ошибка: некорректные значения кортежа."
+
+        names = self.names
+        return [dict(zip(names, values)) for values in zip(*columns)], None
+
+
+# скомпилированные схемы: кортеж (столбец, тип) -> CompiledSchema
+_compiled_schemas = {}
+
+def compile_schema(table_schema):
+    """
+    Компилирует схему таблицы в CompiledSchema. Результат кэшируется по
+    содержимому схемы, поэтому измененная схема компилируется заново.
+    """
+    key = tuple(table_schema.items())
+    compiled = _compiled_schemas.get(key)
+    if compiled is None:
+        compiled = _compiled_schemas[key] = CompiledSchema(table_schema)
+    return compiled
 
-        case "str":
-            if isinstance(value, str):
-                return True, value
-            return True, str(value)
+def invalidate_schema(table_schema):
+    """
+    Удаляет скомпилированную схему из кэша (при удалении таблицы).
+    """
+    _compiled_schemas.pop(tuple(table_schema.items()), None)
 
-        case "bool":
-            if isinstance(value, bool):
-                return True, value
-            if isinstance(value, str):
-                if value.lower() in ('true', '1', 'yes'):
-                    return True, True
-                if value.lower() in ('false', '0', 'no'):
-                    return True, False
-            return False, None
+def next_id(sequences, table_name, table_data):
+    """
+    Выдает следующий ID таблицы из счетчика за O(1).
+    """
+    if table_name not in sequences:
+        # таблица создана до появления счетчика - инициализируем один раз
+        sequences[table_name] = max(table_data.column_values("ID"), default=0)
 
-    return False, None
+    sequences[table_name] += 1
+    return sequences[table_name]
+
+def _append_rows(table_name, converted_rows, table_data, indexes, sequences):
+    """
+    Выдает пачке проверенных кортежей диапазон ID и добавляет ее
+    в таблицу постолбцово. Возвращает (первый ID, последний ID).
+    """
+    sequences = sequences if sequences is not None else {}
+    first_id = next_id(sequences, table_name, table_data)
+    sequences[table_name] = first_id + len(converted_rows) - 1
+
+    new_rows = []
+    for offset, converted_row in enumerate(converted_rows):
+        new_row = {"ID": first_id + offset}
+        new_row.update(converted_row)
+        new_rows.append(new_row)
+
+    start = table_data.extend(new_rows)
+    for index in (indexes or {}).values():
+        for offset, new_row in enumerate(new_rows):
+            index.add(new_row, start + offset)
+
+    return first_id, sequences[table_name]
 
 @handle_db_errors
 @log_time
-def insert(metadata, table_name, values, table_data):
+def insert(metadata, table_name, rows, table_data, indexes=None, sequences=None):
     """
-    Команда для вставки заданных кортежей в таблицу.
+    Команда для вставки заданных кортежей в таблицу. Сначала проверяются
+    и приводятся все кортежи (по скомпилированной схеме таблицы), затем
+    вся пачка получает ID одним диапазоном.
     """
     if table_name not in metadata:
         return metadata, f"Ошибка: таблицы '{table_name}' не существует."
 
-    table_schema = metadata[table_name]
-    columns = list(table_schema.keys())[1:]
+    columns = compile_schema(metadata[table_name])
 
-    if len(values) != len(columns):
-        return (table_data, f"Ошибка: ожидается '{len(columns)}' значений, " +
-                           f"получено '{len(values)}' значений")
+    for values in rows:
+        if len(values) != len(columns):
+            return (table_data, f"Ошибка: ожидается '{len(columns)}' значений, " +
+                               f"получено '{len(values)}' значений")
 
-    if table_data:
-        new_id = max(row["ID"] for row in table_data) + 1
-    else:
-        new_id = 1
+    converted_rows, error = columns.convert_rows(rows)
+    if error:
+        return table_data, error
 
-    new_row = {"ID": new_id}
+    # ID выдаем только после успешной валидации, чтобы не было пропусков
+    first_id, last_id = _append_rows(table_name, converted_rows, table_data,
+                                     indexes, sequences)
+
+    if first_id == last_id:
+        return (table_data, f"Успешно: запись в ID = {first_id} " +
+                f"добавлена в таблицу '{table_name}'.")
+    return (table_data, f"Успешно: записи с ID = {first_id}-{last_id} " +
+            f"добавлены в таблицу '{table_name}'.")
+
+@handle_db_errors
+def import_rows(metadata, table_name, rows, table_data, indexes=None, sequences=None):
+    """
+    Вставляет пачку кортежей-словарей (импорт): сначала проверяет и
+    приводит типы всей пачки, затем выдает ID одним диапазоном.
+    """
+    if table_name not in metadata:
+        return table_data, f"Ошибка: таблицы '{table_name}' не существует."
 
-    for column_name, value in zip(columns, values):
-        expected_type = table_schema[column_name]
-        is_valid, converted_value = validate_value(value, expected_type)
+    columns = compile_schema(metadata[table_name])
+    value_rows = []
 
-        if not is_valid:
-            return (table_data, f"Ошибка: значение '{value}' не соответствует " +
-                    f"типу '{expected_type}' для столбца '{column_name}'")
+    for row in rows:
+        try:
+            value_rows.append([row[name] for name in columns.names])
+        except KeyError as e:
+            return (table_data, "Ошибка: в записи нет значения " +
+                    f"для столбца '{e.args[0]}': {row}")
 
-        new_row[column_name] = converted_value
+    converted_rows, error = columns.convert_rows(value_rows)
+    if error:
+        return table_data, error
 
-    table_data.append(new_row)
-    return (table_data, f"Успешно: запись в ID = {new_id} " +
-            f"добавлена в таблицу '{table_name}'.")
+    if not converted_rows:
+        return table_data, "Успешно: добавлено записей: 0."
+
+    # выдаем ID всей пачке сразу
+    first_id, last_id = _append_rows(table_name, converted_rows, table_data,
+                                     indexes, sequences)
+
+    return (table_data, f"Успешно: добавлено записей: {len(converted_rows)} " +
+            f"(ID {first_id}-{last_id}).")
+
+def iter_positions(table_data, where_clause=None, indexes=None, parallel=True):
+    """
+    Лениво перебирает позиции кортежей, удовлетворяющих условию WHERE.
+    Условие компилируется один раз на запрос; по возможности вместо
+    полного прохода используются индексы (см. predicates.iter_matching),
+    а полный проход по большой таблице выполняется в нескольких процессах.
+    parallel=False - когда нужны только первые позиции (LIMIT без
+    сортировки): параллельный проход проверяет всю таблицу сразу,
+    а ленивый прекращается, как только набрано нужное число.
+    """
+    if not where_clause:
+        return iter(range(len(table_data)))
+    full_scan = parallel_scan if parallel else None
+    return iter_matching(table_data, where_clause, indexes, full_scan=full_scan)
+
+def find_positions(table_data, where_clause, indexes=None):
+    """
+    Возвращает позиции кортежей, удовлетворяющих условию WHERE.
+    """
+    with registry.stage("filter"):
+        return list(iter_positions(table_data, where_clause, indexes))
+
+def _sort_key(column):
+    """
+    Ключ сортировки позиций по столбцу. Для строк сравниваются ранги
+    словаря (числа), а не сами строки; для int - значения массива.
+    """
+    if isinstance(column, StrColumn):
+        order = sorted(range(len(column.strings)), key=column.strings.__getitem__)
+        ranks = [0] * len(order)
+        for rank, code in enumerate(order):
+            ranks[code] = rank
+        codes = column.codes
+        return lambda position: ranks[codes[position]]
+    if isinstance(column, IntColumn):
+        return column.data.__getitem__
+    return column.get
+
+def iter_ordered_positions(table_data, where_clause=None, indexes=None,
+                           order_by=None, limit=None, offset=0):
+    """
+    Позиции кортежей в порядке ORDER BY (в пределах OFFSET/LIMIT):
+    - по упорядоченному индексу столбца - лениво, без сортировки;
+    - по ID - позиции и так упорядочены по ID;
+    - с LIMIT - выбор k первых через кучу, O(N log k);
+    - иначе полная сортировка позиций.
+    Равные значения остаются в порядке вставки.
+    """
+    column_name, descending = order_by
+    if column_name not in table_data.schema:
+        raise ValueError(f"столбец '{column_name}' не найден в таблице")
+
+    indexes = indexes or {}
+    stop = None if limit is None else offset + limit
+    index = indexes.get(column_name)
+
+    if isinstance(index, SortedIndex):
+        primary = indexes["ID"]
+        positions = (primary.position(id_) for id_ in index.ordered(descending))
+        if where_clause:
+            positions = filter(compile_test(where_clause.tree, table_data),
+                               positions)
+        return islice(positions, offset, stop)
+
+    if column_name == "ID":
+        # по возрастанию ID с LIMIT проход можно прервать
+        positions = iter_positions(table_data, where_clause, indexes,
+                                   parallel=descending or stop is None)
+        if descending:
+            positions = reversed(list(positions))
+        return islice(positions, offset, stop)
+
+    positions = iter_positions(table_data, where_clause, indexes)
+    key = _sort_key(table_data.columns[column_name])
+    if stop is not None:
+        select_top = heapq.nlargest if descending else heapq.nsmallest
+        return iter(select_top(stop, positions, key=key)[offset:])
+    return iter(sorted(positions, key=key, reverse=descending)[offset:])
+
+def iter_select(table_data, where_clause=None, indexes=None, limit=None, offset=0,
+                columns=None, order_by=None):
+    """
+    Потоковое чтение: кортежи собираются по одному и только
+    в пределах OFFSET/LIMIT, после LIMIT проход прекращается.
+    columns - список столбцов выборки (None - все): читаются только они,
+    поэтому остальные столбцы бинарной таблицы даже не разбираются.
+    order_by - (столбец, по убыванию) или None.
+    """
+    if columns is not None:
+        for column_name in columns:
+            if column_name not in table_data.schema:
+                raise ValueError(f"столбец '{column_name}' не найден в таблице")
+
+    if order_by is not None:
+        positions = iter_ordered_positions(table_data, where_clause, indexes,
+                                           order_by, limit, offset)
+    else:
+        stop = None if limit is None else offset + limit
+        positions = islice(iter_positions(table_data, where_clause, indexes,
+                                          parallel=stop is None),
+                           offset, stop)
+    return (table_data.row(position, columns) for position in positions)
 
 @handle_db_errors
 @log_time
-def select(table_data, where_clause=None):
+def select(table_data, where_clause=None, indexes=None, limit=None, offset=0,
+           columns=None, order_by=None):
     """
     Команда для чтения данных из таблиц. Возможно задавать условие.
     """
-    if not where_clause:
-        return table_data
-
-    filtered_data = []
+    with registry.stage("filter"):
+        return list(iter_select(table_data, where_clause, indexes, limit, offset,
+                                columns, order_by))
 
-    for row in table_data:
-        match = True
-        for column_name, value in where_clause.items():
-            if column_name not in row or row[column_name] != value:
-                match = False
-                break
+def _aggregate_values(func, values):
+    """
+    Значение агрегатной функции по итератору значений столбца.
+    """
+    match func:
+        case "count":
+            return sum(1 for value in values if value is not None)
+        case "sum":
+            return sum(values)
+        case "min":
+            return min(values, default=None)
+        case "max":
+            return max(values, default=None)
+        case "avg":
+            total = 0
+            number = 0
+            for value in values:
+                total += value
+                number += 1
+            return total / number if number else None
+
+def _check_select_list(table_data, items, group_by):
+    """
+    Проверяет столбцы выборки и группировки по схеме таблицы.
+    """
+    schema = table_data.schema
+    for column in group_by:
+        if column not in schema:
+            raise ValueError(f"столбец '{column}' не найден в таблице")
+
+    for kind, argument in items:
+        if argument == "*":
+            continue
+        if argument not in schema:
+            raise ValueError(f"столбец '{argument}' не найден в таблице")
+        if kind == "column" and argument not in group_by:
+            raise ValueError(f"столбец '{argument}' должен быть в group by " +
+                             "или внутри агрегатной функции")
+        if kind in ("sum", "avg") and schema[argument] not in ("int", "bool"):
+            raise ValueError(f"функция {kind} неприменима к столбцу " +
+                             f"'{argument}' типа '{schema[argument]}'")
+
+def _values_at(column, positions):
+    """
+    Значения столбца по позициям. Для типизированных столбцов чтение
+    идет напрямую из массивов через map (C-вызовы, без методов столбца).
+    """
+    if isinstance(column, StrColumn):
+        return map(column.strings.__getitem__,
+                   map(column.codes.__getitem__, positions))
+    if isinstance(column, BoolColumn):
+        return map(bool, map(column.data.__getitem__, positions))
+    if isinstance(column, IntColumn):
+        return map(column.data.__getitem__, positions)
+    return map(column.get, positions)
+
+def _aggregate_row(table_data, items, positions=None):
+    """
+    Агрегаты по позициям (None - вся таблица). Каждая функция считается
+    встроенными sum/min/max по значениям столбца, без сборки кортежей.
+    """
+    count = len(table_data) if positions is None else len(positions)
+    row = {}
+    for item in items:
+        func, column_name = item
+        if func == "column":
+            continue
+        if column_name == "*":
+            row[select_label(item)] = count
+            continue
+
+        column = table_data.columns[column_name]
+        if positions is None:
+            values = column.values()
+        else:
+            values = _values_at(column, positions)
+
+        if isinstance(column, ObjectColumn):
+            row[select_label(item)] = _aggregate_values(func, values)
+        elif func == "count":
+            # в типизированном столбце пропусков (None) не бывает
+            row[select_label(item)] = count
+        elif func == "avg":
+            row[select_label(item)] = sum(values) / count if count else None
+        else:
+            row[select_label(item)] = _aggregate_values(func, values)
+    return row
 
-        if match:
-            filtered_data.append(row)
+@handle_db_errors
+@log_time
+def aggregate(table_data, items, where_clause=None, indexes=None, group_by=None,
+              limit=None, offset=0, order_by=None):
+    """
+    Агрегатные функции (count, sum, min, max, avg) с группировкой.
+    Группировка - один проход по столбцам группировки, раскладывающий
+    позиции по группам; агрегаты каждой группы считаются по столбцам.
+    Возвращаются только строки-агрегаты; order_by сортирует их
+    по столбцу группировки или заголовку агрегата (например, count(*)).
+    """
+    group_by = group_by or []
+    _check_select_list(table_data, items, group_by)
+
+    labels = [select_label(item) for item in items]
+    if order_by is not None and order_by[0] not in labels:
+        raise ValueError("сортировка возможна только по столбцам выборки: " +
+                         f"{', '.join(labels)}")
+
+    positions = None
+    if where_clause:
+        with registry.stage("filter"):
+            positions = list(iter_positions(table_data, where_clause, indexes))
+
+    if not group_by:
+        rows = [_aggregate_row(table_data, items, positions)]
+        return rows[offset:None if limit is None else offset + limit]
+
+    if positions is None:
+        positions = range(len(table_data))
+    key_columns = [table_data.columns[column] for column in group_by]
+    if len(key_columns) == 1:
+        # одна колонка группировки - ключом служит само значение
+        keys = _values_at(key_columns[0], positions)
+    else:
+        keys = zip(*[_values_at(column, positions) for column in key_columns])
 
-    return filtered_data
+    groups = {}
+    for position, key in zip(positions, keys):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [position]
+        else:
+            group.append(position)
+
+    # без сортировки строки-агрегаты считаются только в пределах LIMIT
+    selected = groups.items()
+    if order_by is None:
+        selected = islice(selected, offset, None if limit is None else offset + limit)
+
+    rows = []
+    for key, group in selected:
+        row = {}
+        group_values = dict(zip(group_by, key if len(group_by) > 1 else (key,)))
+        aggregates = _aggregate_row(table_data, items, group)
+        for item in items:
+            kind, argument = item
+            if kind == "column":
+                row[argument] = group_values[argument]
+            else:
+                row[select_label(item)] = aggregates[select_label(item)]
+        rows.append(row)
+
+    if order_by is None:
+        return rows
+    label, descending = order_by
+    rows.sort(key=lambda row: row[label], reverse=descending)
+    return rows[offset:None if limit is None else offset + limit]
 
 @handle_db_errors
-def update(table_data, set_clause, where_clause=None):
+def update(table_data, set_clause, where_clause=None, indexes=None, updated=None):
     """
     Команда для обновления значений в кортежах. Возможно задавать условие.
+    updated - список, в который добавляются позиции обновленных кортежей
+    (для журнала; условие при этом проверяется один раз).
     """
     if not where_clause:
         return table_data, "Ошибка: необходимо указать условие WHERE"
 
-    updated_ids = []
+    # приводим новые значения к типам столбцов до изменения данных
+    columns = compile_schema(table_data.schema)
+    for column_name in set_clause:
+        if column_name not in columns.names:
+            return (table_data, f"Ошибка: столбец '{column_name}' нельзя обновить: " +
+                    "его нет в таблице или это ID.")
 
-    for row in table_data:
-        match = True
-        for column_name, value in where_clause.items():
-            if column_name not in row or row[column_name] != value:
-                match = False
-                break
+    converted_values, error = columns.convert(set_clause.values(), list(set_clause))
+    if error:
+        return table_data, error
 
-        if match:
-            for column_name, new_value in set_clause.items():
-                if column_name in row and column_name != "ID":
-                    row[column_name] = new_value
-            updated_ids.append(row["ID"])
+    indexes = indexes or {}
+    updated_ids = []
+    # (позиция, старый кортеж, новый кортеж) - для отката при ошибке
+    changed = []
+
+    try:
+        for position in find_positions(table_data, where_clause, indexes):
+            old_row = table_data.row(position)
+            # индексы меняются только после того, как столбцы приняли значения
+            for column_name, new_value in converted_values.items():
+                table_data.set_value(position, column_name, new_value)
+
+            new_row = table_data.row(position)
+            for index in indexes.values():
+                index.remove(old_row)
+                index.add(new_row, position)
+            changed.append((position, old_row, new_row))
+            updated_ids.append(new_row["ID"])
+    except (TypeError, OverflowError) as e:
+        # значение не поместилось в столбец: возвращаем прежнее состояние,
+        # иначе данные в памяти разошлись бы с журналом
+        for column_name in converted_values:
+            table_data.set_value(position, column_name, old_row[column_name])
+        for position, old_row, new_row in reversed(changed):
+            for column_name in converted_values:
+                table_data.set_value(position, column_name, old_row[column_name])
+            for index in indexes.values():
+                index.remove(new_row)
+                index.add(old_row, position)
+        return table_data, f"Ошибка: '{e}'"
+
+    if updated is not None:
+        updated.extend(position for position, _, _ in changed)
 
     if not updated_ids:
         return table_data, "Ошибка: записи, удовлетворяющие условию, не найдены."
@@ -191,37 +684,41 @@ def update(table_data, set_clause, where_clause=None):
 
 @handle_db_errors
 @confirm_action("удаление записей")
-def delete(table_data, where_clause=None):
+def delete(table_data, where_clause=None, indexes=None, deleted=None):
     """
     Команда для удаления кортежей. Возможно задавать условие.
+    deleted - список, в который добавляются ID удаленных кортежей
+    (для журнала; условие при этом проверяется один раз).
     """
     if not where_clause:
         return table_data, "Ошибка: укажите условие WHERE."
 
+    indexes = indexes or {}
+    positions = find_positions(table_data, where_clause, indexes)
     deleted_ids = []
-    new_table_data = []
 
-    for row in table_data:
-        match = True
-        for column_name, value in where_clause.items():
-            if column_name not in row or row[column_name] != value:
-                match = False
-                break
-
-        if match:
-            deleted_ids.append(row["ID"])
-        else:
-            new_table_data.append(row)
+    for position in positions:
+        row = table_data.row(position)
+        for index in indexes.values():
+            index.remove(row)
+        deleted_ids.append(row["ID"])
 
     if not deleted_ids:
         return (table_data, "Ошибка: записи, " +
                 f"удовлетворяющие условию '{where_clause}', не найдены.")
 
+    table_data.delete(positions)
+    if deleted is not None:
+        deleted.extend(deleted_ids)
+    # позиции оставшихся кортежей сдвинулись
+    if "ID" in indexes:
+        indexes["ID"].build(table_data)
+
     ids_str = ", ".join([f"ID={id_}" for id_ in deleted_ids])
-    return new_table_data, f"Успешно: запись c '{ids_str}' успешно удалена из таблицы."
+    return table_data, f"Успешно: запись c '{ids_str}' успешно удалена из таблицы."
 
 @handle_db_errors
-def table_info(metadata, table_name, table_data):
+def table_info(metadata, table_name, table_data, index_config=None):
     """
     Выводит справочную информацию по указанной таблице.
     """
@@ -232,21 +729,96 @@ def table_info(metadata, table_name, table_data):
     columns_str = ", ".join([f"{name}:{type_}" for name, type_ in table_schema.items()])
     record_count = len(table_data)
 
-    return (f"Таблица: {table_name}\n" +
+    info = (f"Таблица: {table_name}\n" +
             f"Столбцы: {columns_str}\nКоличество записей:{record_count}")
 
-@handle_db_errors
-def pretty_table_output(table_data, table_schema):
+    table_indexes = (index_config or {}).get(table_name)
+    if table_indexes:
+        indexes_str = ", ".join([f"{column}:{kind}"
+                                 for column, kind in table_indexes.items()])
+        info += f"\nИндексы: {indexes_str}"
+
+    return info
+
+def pretty_table_pages(rows, table_schema, page_size=OUTPUT_PAGE_SIZE):
+    """
+    Потоковый вывод через PrettyTable: кортежи рендерятся страницами
+    по page_size, заголовок печатается только у первой страницы.
+    Ширины столбцов известны лишь по уже выведенным страницам: если
+    на странице встретилось значение шире, ширины меняются и страница
+    начинается с нового заголовка, чтобы столбцы совпадали с ним.
     """
-    Обработчик вывода таблиц через PrettyTable.
+    from prettytable import PrettyTable
+
+    columns = list(table_schema.keys())
+    # ширины столбцов только растут, чтобы страницы складывались в одну таблицу
+    widths = {col: len(col) for col in columns}
+    rows = iter(rows)
+    first_page = True
+
+    while True:
+        page = list(islice(rows, page_size))
+        if not page:
+            break
+
+        table = PrettyTable()
+        table.field_names = columns
+        widened = False
+        for row in page:
+            values = [row.get(col, '') for col in columns]
+            for col, value in zip(columns, values):
+                width = len(str(value))
+                if width > widths[col]:
+                    widths[col] = width
+                    widened = True
+            table.add_row(values)
+        table.min_width = widths
+        table.header = first_page or widened
+
+        output = str(table)
+        if not first_page and not widened:
+            # верхняя граница совпадает с нижней границей прошлой страницы
+            output = output.split("\n", 1)[1]
+        yield output
+        first_page = False
+
+    if first_page:
+        yield "Записей не найдено."
+
+# табуляция и перевод строки внутри значения не должны ломать строку TSV
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n"})
+
+def tsv_pages(rows, table_schema, page_size=OUTPUT_PAGE_SIZE):
     """
-    if not table_data:
-        return "Записей не найдено."
+    Потоковый вывод в TSV: строка заголовка, затем по строке на кортеж,
+    значения разделены табуляцией. Без зависимостей и выравнивания,
+    поэтому быстрее PrettyTable и удобен для обработки скриптами.
+    """
+    columns = list(table_schema.keys())
+    rows = iter(rows)
+    yield "\t".join(columns)
+
+    while page := list(islice(rows, page_size)):
+        yield "\n".join(["\t".join([str(row.get(col, '')).translate(_TSV_ESCAPES)
+                                    for col in columns])
+                         for row in page])
 
-    table = PrettyTable()
-    table.field_names = list(table_schema.keys())
+# формат вывода выборок
+_output_settings = {"format": OUTPUT_FORMAT}
 
-    for row in table_data:
-        table.add_row([row.get(col, '') for col in table_schema.keys()])
+def set_output_format(fmt):
+    """
+    Задает формат вывода выборок: table (PrettyTable) или tsv.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат вывода '{fmt}'. " +
+                         f"Допустимые: {', '.join(OUTPUT_FORMATS)}")
+    _output_settings["format"] = fmt
 
-    return str(table)
+def render_pages(rows, table_schema):
+    """
+    Вывод выборки страницами в текущем формате.
+    """
+    if _output_settings["format"] == "tsv":
+        return tsv_pages(rows, table_schema)
+    return pretty_table_pages(rows, table_schema)
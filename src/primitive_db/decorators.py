@@ -2,6 +2,10 @@
 import time
 from functools import wraps
 
+from .cache import QueryCache
+from .constants import CACHE_MAX_BYTES, CACHE_MAX_ENTRIES
+from .metrics import is_verbose, registry
+
 
 def handle_db_errors(func):
     """
@@ -31,6 +35,26 @@ def handle_db_errors(func):
     return wrapper
 
 
+# настройки подтверждения "опасных" операций
+_confirm_settings = {"auto_confirm": False, "batch": False}
+
+
+def set_auto_confirm(enabled):
+    """
+    Включает автоматическое подтверждение (для пакетного режима).
+    """
+    _confirm_settings["auto_confirm"] = enabled
+
+
+def set_batch_mode(enabled):
+    """
+    Включает пакетный режим: команды читаются из файла или stdin,
+    поэтому подтверждение не запрашивается - без автоматического
+    подтверждения опасные операции отменяются.
+    """
+    _confirm_settings["batch"] = enabled
+
+
 def confirm_action(action_name):
     """
     Декоратор для запроса подтверждения "опасных" операций.
@@ -39,6 +63,16 @@ def confirm_action(action_name):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            # в пакетном режиме с флагом --yes не спрашиваем
+            if _confirm_settings["auto_confirm"]:
+                return func(*args, **kwargs)
+
+            if _confirm_settings["batch"]:
+                # input() прочитал бы ответом следующую строку скрипта
+                message = ("Операция отменена: в пакетном режиме " +
+                           "подтвердите опасные операции флагом -y.")
+                return (args[0] if args else None), message
+
             # запрашиваем подтверждение
             response = input("Вы уверены, что хотите выполнить" +
                              f"'{action_name}'? [y/n]: ").strip().lower()
@@ -60,45 +94,28 @@ def confirm_action(action_name):
 def log_time(func):
     """
     Декоратор для измерения времени выполнения "долгих" функции.
+    Время записывается в гистограмму метрик op.<функция>,
+    сообщение выводится, только если служебные сообщения включены.
     """
+    name = f"op.{func.__name__}"
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.monotonic()
+        start_time = time.perf_counter()
         result = func(*args, **kwargs)
-        end_time = time.monotonic()
+        elapsed_time = time.perf_counter() - start_time
 
-        elapsed_time = end_time - start_time
-        print(f"Команда '{func.__name__}' выполнилась за {elapsed_time:.3f} секунд.")
+        registry.observe(name, elapsed_time * 1000)
+        if is_verbose():
+            print(f"Команда '{func.__name__}' выполнилась " +
+                  f"за {elapsed_time:.3f} секунд.")
 
         return result
     return wrapper
 
 
-def create_cacher():
+def create_cacher(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
     """
-    Создание кэширующей функции с замыканием.
+    Создание кэша результатов запросов (LRU с ограничением объема).
     """
-    cache = {}
-
-    def cache_result(key, value_func):
-        """
-        Кэширует результат выполнения функции.
-        """
-        if key in cache:
-            print(f"Результат получен из кэша: '{key}'")
-            return cache[key]
-
-        print(f"Вычисление и кэширование: '{key}'")
-        result = value_func()
-        cache[key] = result
-        return result
-
-    def clear_cache():
-        """Очищает весь кэш."""
-        cache.clear()
-        print("Кэш очищен.")
-
-    # Возвращаем обе функции
-    cache_result.clear = clear_cache
-    return cache_result
+    return QueryCache(max_entries, max_bytes)
@@ -1,252 +1,730 @@
+import json
 import shlex
-from pathlib import Path
 
-import prompt
-
-from .constants import DATA_DIR, METADATA_FILE
+from .constants import IMPORT_BATCH_SIZE
 from .core import (
+    aggregate,
+    create_index,
     create_table,
     delete,
     drop_table,
+    import_rows,
     insert,
+    iter_select,
     list_tables,
-    pretty_table_output,
+    render_pages,
     select,
+    set_output_format,
+    set_table_format,
     table_info,
     update,
 )
-from .decorators import create_cacher
+from .decorators import create_cacher, set_batch_mode
+from .fileio import get_durability, write_stats
+from .locking import LockTimeout
+from .metrics import profiled, registry, set_profile, set_verbose
 from .parser import (
-    parse_delete_command,
-    parse_insert_command,
-    parse_select_command,
-    parse_update_command,
-)
-from .utils import (
-    load_metadata,
-    load_table_data,
-    save_metadata,
-    save_table_data,
+    STATEMENT_COMMANDS,
+    parse_statement,
+    select_label,
+    statement_cache,
 )
+from .session import TableManager
+from .utils import TableLoadError, read_import_batches, write_export_rows
 
 # cacher для SELECT'ов
 select_cache = create_cacher()
 
+# команды, изменяющие данные или схему (выполняются под блокировкой записи)
+WRITE_COMMANDS = {"create_table", "drop_table", "create_index", "convert_table",
+                  "insert", "update", "delete", "import"}
+
+# известные команды (метрики по остальным собираются под именем other)
+COMMANDS = WRITE_COMMANDS | STATEMENT_COMMANDS | {
+    "exit", "help", "begin", "commit", "rollback", "cache_stats", "io_stats",
+    "stats", "verbose", "profile", "output_format", "list_tables", "export",
+    "info"}
+
 def print_help():
     """Выводит справочную информацию."""
     print("\n***Операции с данными***")
     print("Функции:")
     print("<command> insert into <имя_таблицы> values " +
           "(<значение1>, <значение2>, ...) - создать запись")
+    print("<command> insert into <имя_таблицы> values " +
+          "(...), (...), ... - создать несколько записей")
     print("<command> select from <имя_таблицы> where " +
-          "<столбец> = <значение> - прочитать записи по условию")
+          "<условие> - прочитать записи по условию")
+    print("    условие: =, !=, <, <=, >, >=, in (...), like '%шаблон_', " +
+          "and, or, not, скобки")
     print("<command> select from <имя_таблицы> - прочитать все записи")
+    print("<command> select from <имя_таблицы> [where ...] limit <n> " +
+          "[offset <m>] - прочитать часть записей")
+    print("<command> select <столбец1>, <столбец2> from <имя_таблицы> " +
+          "[where ...] - прочитать только указанные столбцы")
+    print("<command> select ... from <имя_таблицы> [where ...] " +
+          "order by <столбец> [asc|desc] [limit <n>] - сортировка")
+    print("<command> select count(*), sum(<столбец>), min(...), max(...), " +
+          "avg(...) from <имя_таблицы> [where ...] [group by <столбец>] " +
+          "- агрегаты")
     print("<command> update <имя_таблицы> set <столбец1> " +
           "= <новое_значение1> where <столбец_условия> " +
           "= <значение_условия> - обновить запись")
     print("<command> delete from <имя_таблицы> where " +
           "<столбец> = <значение> - удалить запись")
     print("<command> info <имя_таблицы> - вывести информацию о таблице")
+    print("<command> import <имя_таблицы> <файл.csv|файл.jsonl> " +
+          "- загрузить записи из файла")
+    print("<command> export <имя_таблицы> <файл.csv|файл.jsonl> " +
+          "- выгрузить записи в файл")
     print("\nУправление таблицами:")
     print("<command> create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу")
     print("<command> list_tables - показать список всех таблиц")
     print("<command> drop_table <имя_таблицы> - удалить таблицу")
+    print("<command> create_index <имя_таблицы> <столбец> [hash|sorted] " +
+          "- создать индекс")
+    print("<command> convert_table <имя_таблицы> <json|binary> " +
+          "- сменить формат хранения")
+    print("\nТранзакции:")
+    print("<command> begin - начать транзакцию")
+    print("<command> commit - зафиксировать изменения транзакции")
+    print("<command> rollback - отменить изменения транзакции")
     print("\nОбщие команды:")
     print("<command> exit - выход из программы")
+    print("<command> cache_stats - статистика кэша запросов")
+    print("<command> io_stats - задержки записи на диск")
+    print("<command> stats [reset|json|dump <файл>] - метрики команд и стадий")
+    print("<command> verbose on|off - служебные сообщения (время, кэш)")
+    print("<command> profile cpu|memory|off - профилирование каждой команды")
+    print("<command> output_format table|tsv - формат вывода выборок")
     print("<command> help - справочная информация\n")
 
 def print_welcome():
     """Выводит приветственное сообщение."""
     print("\n***База данных***")
-    print_help()
+    print("Введите 'help', чтобы увидеть список команд.\n")
 
-def run():
+def collect_stats():
     """
-    Главный цикл программы.
+    Метрики процесса вместе со статистикой кэшей и записи на диск.
     """
-    print_welcome()
-
-    # главный цикл, удерживаем сессию
-    while True:
-        try:
-            user_input = prompt.string(">>> Введите команду: ").strip()
+    return {
+        **registry.snapshot(),
+        "select_cache": select_cache.stats(),
+        "statement_cache": statement_cache.stats(),
+        "io": write_stats(),
+    }
+
+def dump_stats(filepath):
+    """
+    Сохраняет метрики (collect_stats) в JSON-файл
+    (stats dump и --metrics-file).
+    """
+    with open(filepath, "w", encoding="utf-8") as file:
+        json.dump(collect_stats(), file, indent=4, ensure_ascii=False)
 
+def save_changes(action):
+    """
+    Выполняет действие сессии, записывающее изменения на диск
+    (after_command, begin, close). Ошибка записи выводится, несохраненные
+    изменения остаются в памяти до следующего сброса.
+    Возвращает True, если запись удалась.
+    """
+    try:
+        action()
+    except OSError as e:
+        print(f"Ошибка: изменения не сохранены на диск: '{e}'")
+        return False
+    return True
+
+def print_stats():
+    """Выводит метрики в табличном виде."""
+    snapshot = registry.snapshot()
+    if not snapshot["counters"] and not snapshot["histograms"]:
+        print("Метрик пока нет.")
+        return
+
+    for name, value in snapshot["counters"].items():
+        print(f"{name}: {value}")
+    for name, summary in snapshot["histograms"].items():
+        print(f"{name}: " + ", ".join([f"{key}={value}"
+                                       for key, value in summary.items()]))
+
+def execute_command(user_input, session, params=None):
+    """
+    Выполняет одну команду в рамках сессии.
+    params - значения для плейсхолдеров ? в insert/select/update/delete.
+    Возвращает False, если пора завершать работу.
+    Время команды записывается в метрики command.<команда>.
+    """
+    words = user_input.split(None, 1)
+
+    # пустой ввод
+    if not words:
+        return True
+
+    command = words[0].lower()
+    name = command if command in COMMANDS else "other"
+    registry.increment(f"commands.{name}")
+    with registry.timer(f"command.{name}"):
+        if command == "profile":  # переключение профилировщика не профилируем
+            return _execute_command(user_input, session, params, words, command)
+        return profiled(_execute_command, user_input, session, params,
+                        words, command)
+
+def _execute_command(user_input, session, params, words, command):
+    with registry.stage("parse"):
+        if command in STATEMENT_COMMANDS:
+            # команды с данными разбираются через кэш шаблонов, без shlex
+            parsed = parse_statement(command, user_input, params)
+            args = words
+        else:
             # разбор с shlex
             try:
                 args = shlex.split(user_input)
             except ValueError as e:
                 print(f"Ошибка парсинга: '{e}'")
-                continue
+                return True
+    if command in STATEMENT_COMMANDS and parsed is None:
+        return True  # ошибка разбора уже выведена
 
-            # handling the commands
-            command = args[0].lower()
-
-            match command:
-
-                case "exit":
-                    print("Выход из программы.")
-                    break
-
-                case "help":
-                    print_help()
-
-                case "create_table":
-                    if len(args) < 3:
-                        print(f"Ошибка: недостаточно аргументов в команде '{command}'. "
-                        + "Используйте: 'create_table <имя_таблицы> <столбец:тип>'.")
-                        continue
-                    table_name = args[1]
-                    column_names = args[2:]
-
-                    metadata = load_metadata(METADATA_FILE)
-
-                    # creating a table and getting a return message
-                    metadata, message = create_table(metadata, table_name, column_names)
-                    print(message)
+    if command in WRITE_COMMANDS:
+        # данные изменяет только один процесс за раз
+        try:
+            session.acquire_writer()
+        except (LockTimeout, OSError) as e:
+            print(f"Ошибка: запись недоступна - {e}.")
+            return True
 
-                    # saving if no error
-                    if not message.startswith("Ошибка"):
-                        save_metadata(METADATA_FILE, metadata)
-                        select_cache.clear() # предотвращаем stale cache
+    match command:
 
-                case "drop_table":
-                    if len(args) < 2:
-                        print(f"Ошибка: недостаточно аргументов в команде '{command}'."
-                              + " Используйте: 'drop_table <имя_таблицы>'.")
-                        continue
+        case "exit":
+            print("Выход из программы.")
+            return False
+
+        case "help":
+            print_help()
+
+        case "create_table":
+            if len(args) < 3:
+                print(f"Ошибка: недостаточно аргументов в команде '{command}'. "
+                + "Используйте: 'create_table <имя_таблицы> <столбец:тип>'.")
+                return True
+            table_name = args[1]
+            column_names = args[2:]
+
+            metadata = session.metadata
+
+            # creating a table and getting a return message
+            metadata, message = create_table(metadata, table_name, column_names)
+            print(message)
+
+            # saving if no error
+            if not message.startswith("Ошибка"):
+                session.set_metadata(metadata)
+
+        case "drop_table":
+            if len(args) < 2:
+                print(f"Ошибка: недостаточно аргументов в команде '{command}'."
+                      + " Используйте: 'drop_table <имя_таблицы>'.")
+                return True
+
+            table_name = args[1]
+            metadata = session.metadata
+
+            # dropping the table and returning the message
+            result = drop_table(metadata, table_name)
+            if result is None:
+                return True
+
+            new_metadata, message = result
+            print(message)
+
+            # saving if no error
+            if message.startswith("Успешно"):
+                session.set_metadata(new_metadata)
+
+                # dropping the data files, indexes and ID counter
+                session.drop_table(table_name)
+
+            select_cache.invalidate(table_name) # предотвращаем stale cache
+
+        case "create_index":
+            if len(args) < 3:
+                print(f"Ошибка: недостаточно аргументов в команде '{command}'."
+                      + " Используйте: 'create_index <имя_таблицы> "
+                      + "<столбец> [hash|sorted]'.")
+                return True
+
+            table_name, column = args[1], args[2]
+            kind = args[3].lower() if len(args) > 3 else "hash"
+
+            metadata = session.metadata
+            index_config = session.index_config
+
+            result = create_index(metadata, index_config,
+                                  table_name, column, kind)
+            if result is None:
+                return True
+
+            index_config, message = result
+            print(message)
+
+            if message.startswith("Успешно"):
+                session.set_index_config(index_config)
+
+        case "convert_table":
+            if len(args) < 3:
+                print(f"Ошибка: недостаточно аргументов в команде '{command}'."
+                      + " Используйте: 'convert_table <имя_таблицы> "
+                      + "<json|binary>'.")
+                return True
+
+            table_name, fmt = args[1], args[2].lower()
+
+            if session.in_transaction:
+                # снимок в новом формате пишется сразу, его не откатить
+                print("Ошибка: convert_table недоступна внутри транзакции.")
+                return True
+
+            # копия, чтобы при ошибке не испортить конфигурацию сессии
+            storage_config = dict(session.storage_config)
+            result = set_table_format(session.metadata, storage_config,
+                                      table_name, fmt)
+            if result is None:
+                return True
+
+            storage_config, message = result
+
+            if message.startswith("Успешно"):
+                try:
+                    session.convert_table(table_name, storage_config)
+                except (OSError, TableLoadError) as e:
+                    print(f"Ошибка: таблица не сконвертирована: '{e}'")
+                    return True
+                select_cache.invalidate(table_name)
+            print(message)
+
+        case "begin":
+            if session.in_transaction:
+                print("Ошибка: транзакция уже начата.")
+                return True
+            if not save_changes(session.begin):
+                return True
+            print("Транзакция начата.")
+
+        case "commit":
+            if not session.in_transaction:
+                print("Ошибка: нет активной транзакции.")
+                return True
+            try:
+                session.commit()
+            except OSError as e:
+                print(f"Ошибка: транзакция не зафиксирована: '{e}'. " +
+                      "Повторите commit.")
+                return True
+            print("Успешно: транзакция зафиксирована.")
+
+        case "rollback":
+            if not session.in_transaction:
+                print("Ошибка: нет активной транзакции.")
+                return True
+            try:
+                touched = session.rollback()
+            except RuntimeError as e:
+                print(f"Ошибка: {e}")
+                return True
+            for table_name in touched:
+                select_cache.invalidate(table_name)
+            print("Транзакция отменена.")
+
+        case "cache_stats":
+            stats = select_cache.stats()
+            print("\n".join([f"{name}: {value}"
+                             for name, value in stats.items()]))
+            stats = statement_cache.stats()
+            print("statements: " + ", ".join([f"{name}={value}"
+                                              for name, value in stats.items()]))
+
+        case "stats":
+            match args[1:]:
+                case []:
+                    print_stats()
+                case ["reset"]:
+                    registry.reset()
+                    print("Метрики сброшены.")
+                case ["json"]:
+                    print(json.dumps(collect_stats(), indent=4, ensure_ascii=False))
+                case ["dump", filepath]:
+                    try:
+                        dump_stats(filepath)
+                        print(f"Метрики сохранены в '{filepath}'.")
+                    except OSError as e:
+                        print(f"Ошибка: '{e}'")
+                case _:
+                    print("Ошибка: используйте 'stats [reset|json|dump <файл>]'.")
+
+        case "verbose":
+            if args[1:] not in (["on"], ["off"]):
+                print("Ошибка: используйте 'verbose on|off'.")
+                return True
+            set_verbose(args[1] == "on")
+
+        case "profile":
+            if len(args) != 2:
+                print("Ошибка: используйте 'profile cpu|memory|off'.")
+                return True
+            try:
+                set_profile(None if args[1] == "off" else args[1])
+            except ValueError as e:
+                print(f"Ошибка: {e}")
 
-                    table_name = args[1]
-                    metadata = load_metadata(METADATA_FILE)
+        case "output_format":
+            if len(args) != 2:
+                print("Ошибка: используйте 'output_format table|tsv'.")
+                return True
+            try:
+                set_output_format(args[1])
+            except ValueError as e:
+                print(f"Ошибка: {e}")
 
-                    # dropping the table and returning the message
-                    result = drop_table(metadata, table_name)
-                    if result is None:
-                        continue
+        case "io_stats":
+            print(f"durability: {get_durability()}")
+            for kind, stats in write_stats().items():
+                print(f"{kind}: " + ", ".join([f"{name}={value}"
+                                               for name, value in stats.items()]))
 
-                    new_metadata, message = result
-                    print(message)
+        case "list_tables":
+            print(list_tables(session.metadata))
 
-                    # saving if no error
-                    if message.startswith("Успешно"):
-                        save_metadata(METADATA_FILE, new_metadata)
+        case "insert":
+            try:
+                table_name, rows = parsed
+
+                metadata = session.metadata
+                table_data, indexes = session.get_table(table_name,
+                                                        writable=True)
+                sequences = session.sequences
+                start = len(table_data)
+
+                with registry.stage("mutate"):
+                    table_data, message = insert(metadata, table_name,
+                                                 rows, table_data,
+                                                 indexes, sequences)
+                print(message)
+
+                if not message.startswith('Ошибка'):
+                    session.mark_sequences()
+                    # в журнал попадут только новые записи, одной записью
+                    if len(table_data) - start == 1:
+                        records = [{"op": "insert", "row": table_data[-1]}]
+                    else:
+                        records = [{"op": "insert_batch",
+                                    "columns": table_data.names,
+                                    "rows": table_data.value_rows(
+                                        start, len(table_data))}]
+                    session.set_table(table_name, table_data, records)
+                    select_cache.invalidate(table_name) # stale cache
+
+            except Exception as e:
+                print(f"Ошибка: {e}")
+
+        case "select": # с кэшированием
+            try:
+                table_name, where_clause, options = parsed
+                limit, offset = options["limit"], options["offset"]
+
+                metadata = session.metadata
+
+                if table_name not in metadata:
+                    print(f"Ошибка: таблицы '{table_name}' не существует.")
+                    return True
+
+                if session.is_stale(table_name):
+                    # таблицу изменил другой процесс
+                    select_cache.invalidate(table_name)
+
+                columns, group_by = options["columns"], options["group_by"]
+                order_by = options["order_by"]
+                order_str = ("" if order_by is None else
+                             f"{order_by[0]} {'desc' if order_by[1] else 'asc'}")
+                output_schema = metadata[table_name]
+
+                projection = None
+                if (columns is not None and not group_by
+                        and all(kind == "column" for kind, _ in columns)):
+                    # только столбцы, без агрегатов - проекция
+                    projection = [name for _, name in columns]
+                    output_schema = {name: metadata[table_name].get(name)
+                                     for name in projection}
+
+                if projection is None and (columns is not None or group_by):
+                    # агрегаты: результат - несколько строк, кэшируем всегда
+                    if columns is None:
+                        print("Ошибка: при group by укажите столбцы выборки.")
+                        return True
+                    labels = [select_label(item) for item in columns]
+                    output_schema = dict.fromkeys(labels)
+                    cache_key = (f"{', '.join(labels)}_{', '.join(group_by)}_" +
+                                 f"{where_clause}_{order_str}_{limit}_{offset}")
+
+                    def fetch_aggregate():
+                        table_data, indexes = session.get_table(table_name)
+                        return aggregate(table_data, columns, where_clause,
+                                         indexes, group_by, limit, offset,
+                                         order_by)
+
+                    filtered_data = select_cache(table_name, cache_key,
+                                                 fetch_aggregate)
+                elif where_clause is None:
+                    # без условия читаем таблицу потоком, без кэша
+                    table_data, indexes = session.get_table(table_name)
+                    filtered_data = iter_select(table_data, None, indexes,
+                                                limit, offset, projection,
+                                                order_by)
+                else:
+                    # создаем ключ для кэша
+                    cache_key = f"{where_clause}_{limit}_{offset}"
+                    if order_by is not None:
+                        cache_key = f"{cache_key}_{order_str}"
+                    if projection is not None:
+                        cache_key = f"{', '.join(projection)}_{cache_key}"
+
+                    # используем кэш
+                    def fetch_data():
+                        table_data, indexes = session.get_table(table_name)
+                        return select(table_data, where_clause, indexes,
+                                      limit, offset, projection, order_by)
+
+                    filtered_data = select_cache(table_name, cache_key,
+                                                 fetch_data)
+
+                if filtered_data is not None:
+                    # потоковая выборка читается по мере вывода страниц
+                    with registry.stage("render"):
+                        for page in render_pages(filtered_data,
+                                                 output_schema):
+                            print(page)
+
+            except Exception as e:
+                print(f"Ошибка: '{e}'")
+
+        case "update":
+            try:
+                table_name, set_clause, where_clause = parsed
+
+                metadata = session.metadata
+
+                if table_name not in metadata:
+                    print(f"Ошибка: таблицы '{table_name}' не существует.")
+                    return True
+
+                table_data, indexes = session.get_table(table_name,
+                                                        writable=True)
+                # затрагиваемые кортежи нужны для журнала
+                updated = []
+                with registry.stage("mutate"):
+                    table_data, message = update(table_data, set_clause,
+                                                 where_clause, indexes, updated)
+                print(message)
+
+                if not message.startswith("Ошибка"):
+                    session.set_table(table_name, table_data,
+                                      [{"op": "update",
+                                        "row": table_data.row(position)}
+                                       for position in updated])
+                    select_cache.invalidate(table_name) # stale cache
+
+            except Exception as e:
+                print(f"Ошибка: '{e}'")
+
+        case "delete":
+            try:
+                table_name, where_clause = parsed
 
-                        # dropping the corresponding JSON file
-                        data_file = Path(DATA_DIR) / f"{table_name}.json"
-                        if data_file.exists():
-                            data_file.unlink()
+                metadata = session.metadata
 
-                    select_cache.clear() # предотвращаем stale cache
+                if table_name not in metadata:
+                    print(f"Ошибка: таблицы '{table_name}' не существует.")
+                    return True
 
-                case "list_tables":
-                    metadata = load_metadata(METADATA_FILE)
-                    print(list_tables(metadata))
+                table_data, indexes = session.get_table(table_name,
+                                                        writable=True)
+                # затрагиваемые кортежи нужны для журнала
+                deleted = []
+                with registry.stage("mutate"):
+                    table_data, message = delete(table_data, where_clause,
+                                                 indexes, deleted)
+                print(message)
 
-                case "insert":
-                    try:
-                        table_name, values = parse_insert_command(user_input)
+                if message.startswith("Успешно"):
+                    session.set_table(table_name, table_data,
+                                      [{"op": "delete", "id": id_}
+                                       for id_ in deleted])
+                    select_cache.invalidate(table_name) # stale cache
 
-                        metadata = load_metadata(METADATA_FILE)
-                        table_data = load_table_data(table_name, DATA_DIR)
+            except Exception as e:
+                print(f"Ошибка: '{e}'")
 
-                        table_data, message = insert(metadata, table_name,
-                                                     values, table_data)
+        case "import":
+            try:
+                if len(args) < 3:
+                    print("Ошибка: используйте 'import <имя_таблицы> <файл>'.")
+                    return True
+
+                table_name, filepath = args[1], args[2]
+                metadata = session.metadata
+
+                if table_name not in metadata:
+                    print(f"Ошибка: таблицы '{table_name}' не существует.")
+                    return True
+
+                table_data, indexes = session.get_table(table_name,
+                                                        writable=True)
+                imported = 0
+
+                for batch in read_import_batches(filepath,
+                                                 IMPORT_BATCH_SIZE):
+                    start = len(table_data)
+                    with registry.stage("mutate"):
+                        table_data, message = import_rows(
+                            metadata, table_name, batch, table_data,
+                            indexes, session.sequences)
+
+                    if message.startswith("Ошибка"):
                         print(message)
+                        break
+
+                    # одна запись в журнал на пачку
+                    session.mark_sequences()
+                    session.set_table(table_name, table_data,
+                                      [{"op": "insert_batch",
+                                        "columns": table_data.names,
+                                        "rows": table_data.value_rows(
+                                            start, len(table_data))}])
+                    # блокировка записи держится до конца команды
+                    session.save()
+                    imported += len(table_data) - start
+
+                select_cache.invalidate(table_name) # stale cache
+                print(f"Импортировано записей: {imported}.")
+
+            except Exception as e:
+                print(f"Ошибка: '{e}'")
+
+        case "export":
+            try:
+                if len(args) < 3:
+                    print("Ошибка: используйте 'export <имя_таблицы> <файл>'.")
+                    return True
 
-                        if not message.startswith('Ошибка'):
-                            save_table_data(table_name, table_data, DATA_DIR)
-                            select_cache.clear() # предотвращаем stale cache
-
-                    except Exception as e:
-                        print(f"Ошибка: {e}")
-
-                case "select": # с кэшированием
-                    try:
-                        table_name, where_clause = parse_select_command(user_input)
-
-                        metadata = load_metadata(METADATA_FILE)
-
-                        if table_name not in metadata:
-                            print(f"Ошибка: таблицы '{table_name}' не существует.")
-                            continue
-
-                        # создаем ключ для кэша
-                        cache_key = f"{table_name}_{str(where_clause)}"
-
-                        # используем кэш
-                        def fetch_data():
-                            table_data = load_table_data(table_name, DATA_DIR)
-                            return select(table_data, where_clause)
+                table_name, filepath = args[1], args[2]
+                metadata = session.metadata
 
-                        filtered_data = select_cache(cache_key, fetch_data)
+                if table_name not in metadata:
+                    print(f"Ошибка: таблицы '{table_name}' не существует.")
+                    return True
 
-                        if filtered_data is not None:
-                            print(pretty_table_output(filtered_data,
-                                                      metadata[table_name]))
+                table_data, _ = session.get_table(table_name)
+                exported = write_export_rows(filepath, iter(table_data),
+                                             list(metadata[table_name]))
+                print(f"Экспортировано записей: {exported}.")
 
-                    except Exception as e:
-                        print(f"Ошибка: '{e}'")
+            except Exception as e:
+                print(f"Ошибка: '{e}'")
 
-                case "update":
-                    try:
-                        table_name, set_clause, where_clause =\
-                            parse_update_command(user_input)
+        case "info":
+            try:
+                if len(args) < 2:
+                    print("Ошибка: не указано имя таблицы.")
+                    return True
 
-                        metadata = load_metadata(METADATA_FILE)
+                table_name = args[1]
+                table_data, _ = session.get_table(table_name)
 
-                        if table_name not in metadata:
-                            print(f"Ошибка: таблицы '{table_name}' не существует.")
-                            continue
+                print(table_info(session.metadata, table_name,
+                                 table_data, session.index_config))
+            except Exception as e:
+                print(f"Ошибка: '{e}'")
 
-                        table_data = load_table_data(table_name, DATA_DIR)
-                        table_data, message = update(table_data,
-                                                     set_clause, where_clause)
-                        print(message)
+        case _:
+            print(f"Неизвестная команда '{command}'.")
 
-                        if not message.startswith("Ошибка"):
-                            save_table_data(table_name, table_data, DATA_DIR)
-                            select_cache.clear() # предотвращаем stale cache
+    return True
 
-                    except Exception as e:
-                        print(f"Ошибка: '{e}'")
+def _start_idle_flush(session):
+    """
+    Политика interval: пока сессия ждет ввода, изменения сбрасываются
+    по таймеру в конце интервала, а блокировка записи освобождается -
+    иначе простаивающая сессия держала бы ее бесконечно.
+    Возвращает запущенный таймер или None.
+    """
+    delay = session.idle_flush_delay()
+    if delay is None:
+        return None
 
-                case "delete":
-                    try:
-                        table_name, where_clause = parse_delete_command(user_input)
+    # потоки нужны только интерактивному режиму
+    import threading
 
-                        metadata = load_metadata(METADATA_FILE)
+    timer = threading.Timer(delay, save_changes, [session.flush])
+    timer.daemon = True
+    timer.start()
+    return timer
 
-                        if table_name not in metadata:
-                            print(f"Ошибка: таблицы '{table_name}' не существует.")
-                            continue
+def run():
+    """
+    Главный цикл программы.
+    """
+    # prompt нужен только в интерактивном режиме
+    import prompt
 
-                        table_data = load_table_data(table_name, DATA_DIR)
-                        table_data, message = delete(table_data, where_clause)
-                        print(message)
+    print_welcome()
 
-                        if not message.startswith("Ошибка"):
-                            save_table_data(table_name, table_data, DATA_DIR)
-                            select_cache.clear() # предотвращаем stale cache
+    # таблицы сессии держим в памяти между командами
+    session = TableManager()
 
-                    except Exception as e:
-                        print(f"Ошибка: '{e}'")
+    # главный цикл, удерживаем сессию
+    while True:
+        try:
+            save_changes(session.after_command)
 
-                case "info":
-                    try:
-                        if len(args) < 2:
-                            print("Ошибка: не указано имя таблицы.")
-                            continue
+            timer = _start_idle_flush(session)
+            try:
+                user_input = prompt.string(">>> Введите команду: ").strip()
+            finally:
+                if timer is not None:
+                    # сброс по таймеру идет только пока команда не выполняется
+                    timer.cancel()
+                    timer.join()
+
+            if not execute_command(user_input, session):
+                save_changes(session.close)
+                break
+
+        except (KeyboardInterrupt, EOFError):
+            save_changes(session.close)
+            print("\nВыполнение прервано пользователем")
+            break
 
-                        table_name = args[1]
-                        metadata = load_metadata(METADATA_FILE)
-                        table_data = load_table_data(table_name, DATA_DIR)
+def run_script(commands):
+    """
+    Пакетное выполнение команд без интерактивного ввода.
+    Таблицы держатся в памяти между командами, изменения
+    сбрасываются на диск один раз в конце.
+    """
+    session = TableManager(flush_policy="exit")
+    set_batch_mode(True)
 
-                        print(table_info(metadata, table_name, table_data))
-                    except Exception as e:
-                        print(f"Ошибка: '{e}'")
+    try:
+        for user_input in commands:
+            user_input = user_input.strip().removesuffix(";").strip()
 
-                case _:
-                    print(f"Неизвестная команда '{command}'.")
+            # пустые строки и комментарии пропускаем
+            if not user_input or user_input.startswith(("#", "--")):
+                continue
 
-        except KeyboardInterrupt:
-            print("\nВыполнение прервано пользователем")
-            break
\ No newline at end of file
+            if not execute_command(user_input, session):
+                break
+    finally:
+        set_batch_mode(False)
+        save_changes(session.close)
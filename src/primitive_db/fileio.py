@@ -0,0 +1,147 @@
+# src/primitive_db/fileio.py
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .constants import DURABILITY
+from .metrics import registry
+
+# режимы долговечности записи:
+# always - fsync после каждой записи (в т.ч. дописывания журнала),
+# commit - fsync только при атомарной подмене файлов (снимки,
+#          конфигурации, файл транзакции), журнал не синхронизируется,
+# never - без fsync (от падения процесса защищает подмена файла)
+DURABILITY_MODES = {"always", "commit", "never"}
+
+_io_settings = {"durability": DURABILITY}
+
+# вид записи -> {"count", "total_ms", "max_ms", "bytes", "fsyncs"}
+_write_stats = {}
+
+
+def set_durability(mode):
+    """
+    Задает режим долговечности записи.
+    """
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"Неизвестный режим долговечности '{mode}'. " +
+                         f"Допустимые: {', '.join(sorted(DURABILITY_MODES))}")
+    _io_settings["durability"] = mode
+
+
+def get_durability():
+    """Текущий режим долговечности записи."""
+    return _io_settings["durability"]
+
+
+def _needs_fsync(level):
+    mode = _io_settings["durability"]
+    return mode == "always" or (mode == "commit" and level == "commit")
+
+
+def _fsync_dir(path):
+    """
+    Синхронизирует запись каталога, чтобы переименование пережило сбой
+    питания. На платформах без поддержки (Windows) пропускается.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _record(kind, start, size, fsynced):
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    stats = _write_stats.setdefault(kind, {"count": 0, "total_ms": 0.0,
+                                           "max_ms": 0.0, "bytes": 0,
+                                           "fsyncs": 0})
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    stats["bytes"] += size
+    stats["fsyncs"] += fsynced
+    registry.observe(f"io.{kind}", elapsed_ms)
+
+
+@contextmanager
+def atomic_write(filepath, kind, binary=False, level="commit"):
+    """
+    Открывает временный файл рядом с целевым; после успешной записи
+    делает fsync (по режиму долговечности) и атомарно подменяет им
+    целевой файл. При ошибке целевой файл остается нетронутым.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = filepath.with_name(filepath.name + ".tmp")
+    fsync = _needs_fsync(level)
+    start = time.perf_counter()
+
+    try:
+        if binary:
+            file = open(tmp_path, "wb")
+        else:
+            file = open(tmp_path, "w", encoding="utf-8", newline="")
+        with file:
+            yield file
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if fsync:
+        _fsync_dir(filepath.parent)
+    _record(kind, start, filepath.stat().st_size, fsync)
+
+
+@contextmanager
+def append_write(filepath, kind, level="always"):
+    """
+    Открывает файл на дописывание (журнал изменений);
+    после записи делает fsync по режиму долговечности.
+    При ошибке недописанный хвост обрезается: иначе после повторной
+    записи журнал читался бы только до оборванной строки.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fsync = _needs_fsync(level)
+    start = time.perf_counter()
+
+    file = open(filepath, "a", encoding="utf-8")
+    offset = file.tell()
+    try:
+        with file:
+            yield file
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+            size = file.tell() - offset
+    except BaseException:
+        try:
+            os.truncate(filepath, offset)
+        except OSError:
+            pass
+        raise
+
+    _record(kind, start, size, fsync)
+
+
+def write_stats():
+    """
+    Метрики задержки записи по видам файлов.
+    """
+    return {kind: {"count": stats["count"],
+                   "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                   "max_ms": round(stats["max_ms"], 3),
+                   "bytes": stats["bytes"],
+                   "fsyncs": stats["fsyncs"]}
+            for kind, stats in _write_stats.items()}
@@ -0,0 +1,175 @@
+# src/primitive_db/indexes.py
+from bisect import bisect_left, bisect_right, insort
+
+INDEX_TYPES = {"hash", "sorted"}
+
+
+class HashIndex:
+    """
+    Хэш-индекс по столбцу: значение -> ID кортежей с этим значением.
+    Подходит для условий равенства.
+    """
+
+    kind = "hash"
+
+    def __init__(self, column):
+        self.column = column
+        self.buckets = {}
+
+    def build(self, table_data):
+        """Строит индекс по всем кортежам таблицы."""
+        self.buckets = {}
+        buckets = self.buckets
+        for id_, value in zip(table_data.column_values("ID"),
+                              table_data.column_values(self.column)):
+            buckets.setdefault(value, set()).add(id_)
+
+    def add(self, row, position=None):
+        """Добавляет кортеж в индекс."""
+        value = row.get(self.column)
+        self.buckets.setdefault(value, set()).add(row["ID"])
+
+    def remove(self, row):
+        """Удаляет кортеж из индекса."""
+        value = row.get(self.column)
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            return
+        bucket.discard(row["ID"])
+        if not bucket:
+            del self.buckets[value]
+
+    def lookup(self, value):
+        """Возвращает ID кортежей с заданным значением (по возрастанию)."""
+        bucket = self.buckets.get(value)
+        if not bucket:
+            return []
+        return sorted(bucket)
+
+
+class SortedIndex(HashIndex):
+    """
+    Упорядоченный индекс по столбцу. Помимо равенства
+    поддерживает выборку по диапазону значений.
+    """
+
+    kind = "sorted"
+
+    def __init__(self, column):
+        super().__init__(column)
+        self.keys = []
+
+    def build(self, table_data):
+        """Строит индекс по всем кортежам таблицы."""
+        super().build(table_data)
+        self.keys = sorted(self.buckets)
+
+    def add(self, row, position=None):
+        """Добавляет кортеж в индекс."""
+        value = row.get(self.column)
+        if value not in self.buckets:
+            insort(self.keys, value)
+        super().add(row, position)
+
+    def remove(self, row):
+        """Удаляет кортеж из индекса."""
+        value = row.get(self.column)
+        super().remove(row)
+        if value not in self.buckets:
+            position = bisect_left(self.keys, value)
+            if position < len(self.keys) and self.keys[position] == value:
+                del self.keys[position]
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        """
+        Возвращает ID кортежей со значениями в диапазоне [low, high]
+        (границы опциональны), упорядоченные по значению.
+        """
+        if low is None:
+            start = 0
+        elif include_low:
+            start = bisect_left(self.keys, low)
+        else:
+            start = bisect_right(self.keys, low)
+
+        if high is None:
+            end = len(self.keys)
+        elif include_high:
+            end = bisect_right(self.keys, high)
+        else:
+            end = bisect_left(self.keys, high)
+
+        ids = []
+        for value in self.keys[start:end]:
+            ids.extend(self.lookup(value))
+        return ids
+
+    def ordered(self, descending=False):
+        """
+        Лениво перебирает ID в порядке значений столбца
+        (при равных значениях - по возрастанию ID).
+        """
+        keys = reversed(self.keys) if descending else self.keys
+        for value in keys:
+            yield from self.lookup(value)
+
+
+class PrimaryKeyIndex:
+    """
+    Индекс первичного ключа: ID -> позиция кортежа в таблице.
+    Есть всегда, поэтому условия вида ID = n не требуют прохода;
+    через него же остальные индексы переводят ID в позиции.
+    Отдельной структуры не хранит: ID выдаются по возрастанию, а новые
+    кортежи добавляются в конец, поэтому столбец ID упорядочен и позиция
+    находится двоичным поиском прямо по нему (в т.ч. по файлу в mmap) -
+    загрузка таблицы и удаление кортежей не проходят по всему столбцу.
+    """
+
+    kind = "primary"
+
+    def __init__(self, column="ID"):
+        self.column = column
+        self.table = None
+
+    def build(self, table_data):
+        """Привязывает индекс к таблице."""
+        self.table = table_data
+
+    def add(self, row, position=None):
+        """Кортеж уже добавлен в конец таблицы - индекс менять не нужно."""
+
+    def remove(self, row):
+        """Позиции берутся из самой таблицы - индекс менять не нужно."""
+
+    def lookup(self, value):
+        """Возвращает ID, если он есть в таблице (список из 0 или 1 элемента)."""
+        try:
+            self.position(value)
+        except (KeyError, TypeError):  # TypeError - значение не сравнимо с ID
+            return []
+        return [value]
+
+    def position(self, id_):
+        """Позиция кортежа с заданным ID (KeyError, если его нет)."""
+        ids = self.table.columns[self.column].data
+        position = bisect_left(ids, id_)
+        if position < len(ids) and ids[position] == id_:
+            return position
+        raise KeyError(id_)
+
+
+def build_indexes(index_config, table_data):
+    """
+    Строит индексы таблицы по конфигурации {столбец: тип_индекса}.
+    Индекс по ID строится всегда.
+    """
+    primary = PrimaryKeyIndex()
+    primary.build(table_data)
+    indexes = {"ID": primary}
+    for column, kind in (index_config or {}).items():
+        if column == "ID":
+            continue
+        index = SortedIndex(column) if kind == "sorted" else HashIndex(column)
+        index.build(table_data)
+        indexes[column] = index
+    return indexes
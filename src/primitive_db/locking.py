@@ -0,0 +1,110 @@
+# src/primitive_db/locking.py
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .constants import LOCK_TIMEOUT
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки между процессами не поддерживаются
+    fcntl = None
+
+# интервал повторных попыток захвата блокировки (секунды)
+_POLL_INTERVAL = 0.01
+
+_lock_settings = {"timeout": LOCK_TIMEOUT}
+
+
+class LockTimeout(TimeoutError):
+    """Блокировку не удалось получить за отведенное время."""
+
+
+def set_lock_timeout(seconds):
+    """
+    Задает время ожидания блокировки в секундах (None - ждать без ограничения).
+    """
+    if seconds is not None and seconds < 0:
+        raise ValueError("Время ожидания блокировки не может быть отрицательным.")
+    _lock_settings["timeout"] = seconds
+
+
+def get_lock_timeout():
+    """Текущее время ожидания блокировки."""
+    return _lock_settings["timeout"]
+
+
+class FileLock:
+    """
+    Блокировка файла между процессами (flock): разделяемая для чтения
+    или исключительная для записи. Файл блокировки создается при первом
+    захвате и не удаляется.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fd = None
+
+    @property
+    def held(self):
+        """Удерживается ли блокировка этим объектом."""
+        return self.fd is not None
+
+    def acquire(self, exclusive=False):
+        """
+        Захватывает блокировку, ожидая не дольше заданного времени.
+        Повторный захват уже удерживаемой блокировки ничего не делает.
+        """
+        if self.fd is not None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            self.fd = fd
+            return
+
+        mode = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+        timeout = _lock_settings["timeout"]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, mode)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise LockTimeout(f"'{self.path.name}' занят другим процессом " +
+                                      f"(ожидание {timeout} с)") from None
+                time.sleep(_POLL_INTERVAL)
+        self.fd = fd
+
+    def release(self):
+        """Освобождает блокировку."""
+        if self.fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+@contextmanager
+def locked(path, exclusive=False):
+    """
+    Удерживает блокировку файла на время блока with.
+    """
+    lock = FileLock(path)
+    lock.acquire(exclusive)
+    try:
+        yield lock
+    finally:
+        lock.release()
+
+
+def table_lock_path(table_name, data_dir):
+    """
+    Путь к файлу блокировки таблицы.
+    """
+    return Path(data_dir)/f"{table_name}.lock"
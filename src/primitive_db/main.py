@@ -1,10 +1,121 @@
 #!/usr/bin/env python3
-from primitive_db.engine import run
+import argparse
+import sys
 
+from primitive_db.constants import OUTPUT_FORMATS, SERVER_HOST, SERVER_PORT
+from primitive_db.core import set_output_format
+from primitive_db.decorators import set_auto_confirm
+from primitive_db.engine import dump_stats, run, run_script
+from primitive_db.fileio import DURABILITY_MODES, set_durability
+from primitive_db.locking import set_lock_timeout
+from primitive_db.metrics import PROFILE_MODES, set_profile, set_verbose
+from primitive_db.scan import set_scan_threshold, set_scan_workers
 
-def main():
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        prog="database",
+        description="Примитивная база данных. Без аргументов запускается "
+                    "интерактивный режим, при перенаправленном stdin - "
+                    "пакетный режим.")
+    parser.add_argument("mode", nargs="?", choices=["serve", "client"],
+                        help="serve - запустить сервер, client - выполнить "
+                             "команды на сервере")
+    parser.add_argument("-f", "--file",
+                        help="выполнить команды из файла ('-' - из stdin)")
+    parser.add_argument("-c", "--command", action="append",
+                        help="выполнить команду (можно указать несколько раз)")
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help="автоматически подтверждать опасные операции")
+    parser.add_argument("--durability", choices=sorted(DURABILITY_MODES),
+                        help="режим fsync при записи на диск")
+    parser.add_argument("--lock-timeout", type=float, metavar="SECONDS",
+                        help="сколько ждать блокировку, занятую другим процессом")
+    parser.add_argument("--scan-workers", type=int, metavar="N",
+                        help="процессов для прохода по большой таблице "
+                             "(0 - по числу ядер, 1 - без распараллеливания)")
+    parser.add_argument("--scan-threshold", type=int, metavar="ROWS",
+                        help="с какого числа кортежей проход распараллеливается")
+    parser.add_argument("--host", default=SERVER_HOST,
+                        help=f"адрес сервера (по умолчанию {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT,
+                        help=f"порт сервера (по умолчанию {SERVER_PORT})")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="Unix-сокет сервера вместо TCP-порта")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS,
+                        help="формат вывода выборок: table или tsv")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="не выводить служебные сообщения (время, кэш)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="client: запрашивать у сервера служебные сообщения")
+    parser.add_argument("--profile", choices=sorted(PROFILE_MODES),
+                        help="профилировать каждую команду")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="сохранить метрики в JSON-файл при выходе")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Точка входа в программу."""
-    run()
+    args = parse_args(argv)
+
+    if args.yes:
+        set_auto_confirm(True)
+    if args.durability:
+        set_durability(args.durability)
+    if args.lock_timeout is not None:
+        set_lock_timeout(args.lock_timeout)
+    if args.scan_workers is not None:
+        set_scan_workers(args.scan_workers)
+    if args.scan_threshold is not None:
+        set_scan_threshold(args.scan_threshold)
+    if args.quiet:
+        set_verbose(False)
+    if args.profile:
+        set_profile(args.profile)
+    if args.output_format:
+        set_output_format(args.output_format)
+
+    if args.mode == "client":
+        # сетевые модули загружаются только в своих режимах
+        from primitive_db.client import run_client
+
+        if args.command:
+            commands = [line for command in args.command
+                        for line in command.splitlines()]
+            sys.exit(run_client(commands, args.host, args.port, args.socket,
+                                args.verbose))
+        if args.file and args.file != "-":
+            with open(args.file, "r", encoding="utf-8") as file:
+                sys.exit(run_client(file, args.host, args.port, args.socket,
+                                    args.verbose))
+        sys.exit(run_client(None, args.host, args.port, args.socket, args.verbose))
+
+    try:
+        run_local(args)
+    finally:
+        if args.metrics_file:
+            dump_stats(args.metrics_file)
+
+def run_local(args):
+    """Запускает сервер, пакетный или интерактивный режим."""
+    if args.mode == "serve":
+        from primitive_db.server import serve
+
+        serve(args.host, args.port, args.socket)
+        return
+
+    if args.command:
+        # несколько команд можно передать и через перевод строки
+        run_script(line for command in args.command
+                   for line in command.splitlines())
+    elif args.file == "-" or (args.file is None and not sys.stdin.isatty()):
+        run_script(sys.stdin)
+    elif args.file:
+        with open(args.file, "r", encoding="utf-8") as file:
+            run_script(file)
+    else:
+        run()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
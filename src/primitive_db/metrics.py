@@ -0,0 +1,176 @@
+# src/primitive_db/metrics.py
+import io
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .constants import METRICS_SAMPLES, PROFILE_TOP, VERBOSE
+
+# служебные сообщения (время команд, обращения к кэшу) и профилирование
+_log_settings = {"verbose": VERBOSE, "profile": None}
+PROFILE_MODES = {"cpu", "memory"}
+
+
+def set_verbose(enabled):
+    """Включает или отключает служебные сообщения."""
+    _log_settings["verbose"] = enabled
+
+
+def is_verbose():
+    """Выводятся ли служебные сообщения."""
+    return _log_settings["verbose"]
+
+
+def log(message):
+    """
+    Выводит служебное сообщение, если они не отключены.
+    """
+    if _log_settings["verbose"]:
+        print(message)
+
+
+class Histogram:
+    """
+    Распределение значений (мс): число, сумма и максимум считаются точно,
+    перцентили - по последним METRICS_SAMPLES значениям.
+    """
+
+    def __init__(self, max_samples=METRICS_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value):
+        """Добавляет значение."""
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def summary(self):
+        """Сводка: count, mean, p50/p95/p99, max."""
+        ordered = sorted(self.samples)
+
+        def percentile(share):
+            return round(ordered[min(len(ordered) - 1, int(share * len(ordered)))], 4)
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 4),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max, 4),
+        }
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса: счетчики и гистограммы задержек по имени.
+    Стадии выполнения команд (parse, load, filter, mutate, save, render)
+    записываются в гистограммы stage.<стадия>, команды - в command.<команда>.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1):
+        """Увеличивает счетчик."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value_ms):
+        """Добавляет значение в гистограмму."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value_ms)
+
+    @contextmanager
+    def timer(self, name):
+        """Замеряет время блока with в гистограмму name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def stage(self, name):
+        """Таймер стадии выполнения команды."""
+        return self.timer(f"stage.{name}")
+
+    def snapshot(self):
+        """Все метрики в виде словаря (для вывода и выгрузки в JSON)."""
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {name: histogram.summary() for name, histogram
+                           in sorted(self.histograms.items())},
+        }
+
+    def reset(self):
+        """Сбрасывает все метрики."""
+        self.counters.clear()
+        self.histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+def set_profile(mode):
+    """
+    Включает профилирование каждой команды: cpu (cProfile),
+    memory (tracemalloc) или None - выключено.
+    """
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError(f"Неизвестный режим профилирования '{mode}'. " +
+                         f"Допустимые: {', '.join(sorted(PROFILE_MODES))}")
+    _log_settings["profile"] = mode
+
+
+def get_profile():
+    """Текущий режим профилирования."""
+    return _log_settings["profile"]
+
+
+def profiled(func, *args, **kwargs):
+    """
+    Выполняет func под профилировщиком, если он включен, и выводит
+    PROFILE_TOP самых затратных функций или мест выделения памяти.
+    """
+    mode = _log_settings["profile"]
+    if mode is None:
+        return func(*args, **kwargs)
+
+    # профилировщики загружаются только при включенном профилировании
+    if mode == "cpu":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+            print(output.getvalue().strip())
+
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        print(f"Память: текущая {current / 1024:.1f} КБ, пик {peak / 1024:.1f} КБ")
+        for line in after.compare_to(before, "lineno")[:PROFILE_TOP]:
+            print(line)
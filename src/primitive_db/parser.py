@@ -1,31 +1,170 @@
 # src/primitive_db/parser.py
 import re
-import shlex
+from collections import OrderedDict
 
+from .constants import (
+    AGGREGATE_FUNCTIONS,
+    STATEMENT_CACHE_MAX_LITERALS,
+    STATEMENT_CACHE_SIZE,
+)
 from .decorators import handle_db_errors
+from .predicates import Condition
+
+
+class Param:
+    """
+    Плейсхолдер значения в разобранной команде (шаблоне).
+    При выполнении заменяется значением с тем же номером.
+    """
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __repr__(self):
+        return "?"
+
+    def __eq__(self, other):
+        return isinstance(other, Param) and self.index == other.index
+
+    def __hash__(self):
+        return hash(("?", self.index))
+
+
+# лексемы условия WHERE: строка в кавычках, оператор сравнения,
+# скобки/запятая, слово (столбец, ключевое слово или значение)
+_WHERE_TOKEN = re.compile(r"""\s*(?:
+    (?P<string>"[^"]*"|'[^']*')
+  | (?P<op><=|>=|!=|<>|=|<|>)
+  | (?P<punct>[(),])
+  | (?P<word>[^\s()<>=!,"']+)
+)""", re.VERBOSE)
+
+_KEYWORDS = {"and", "or", "not", "in", "like"}
+
+
+def _tokenize_where(where_clause):
+    """
+    Разбивает условие WHERE на лексемы (вид, текст).
+    """
+    tokens = []
+    position = 0
+    where_clause = where_clause.rstrip()
+    while position < len(where_clause):
+        match = _WHERE_TOKEN.match(where_clause, position)
+        if not match or match.end() == position:
+            raise ValueError(f"некорректное условие '{where_clause}'")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "word" and text.lower() in _KEYWORDS:
+            kind, text = "keyword", text.lower()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _WhereParser:
+    """
+    Рекурсивный спуск по грамматике условия:
+    expr := and_expr (OR and_expr)*
+    and_expr := not_expr (AND not_expr)*
+    not_expr := NOT not_expr | '(' expr ')' | столбец сравнение
+    сравнение := op значение | [NOT] IN (значение, ...) | [NOT] LIKE значение
+    """
+
+    def __init__(self, where_clause):
+        self.text = where_clause
+        self.tokens = _tokenize_where(where_clause)
+        self.position = 0
+
+    def error(self):
+        return ValueError(f"некорректное условие '{self.text}'")
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self, kind=None, text=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or \
+                (text and token[1] != text):
+            raise self.error()
+        self.position += 1
+        return token[1]
+
+    def accept(self, kind, text=None):
+        token = self.peek()
+        if token[0] == kind and (text is None or token[1] == text):
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        tree = self.expr()
+        if self.peek()[0] is not None:
+            raise self.error()
+        return tree
+
+    def expr(self):
+        children = [self.and_expr()]
+        while self.accept("keyword", "or"):
+            children.append(self.and_expr())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def and_expr(self):
+        children = [self.not_expr()]
+        while self.accept("keyword", "and"):
+            children.append(self.not_expr())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def not_expr(self):
+        if self.accept("keyword", "not"):
+            return ("not", self.not_expr())
+        if self.accept("punct", "("):
+            tree = self.expr()
+            self.take("punct", ")")
+            return tree
+        return self.comparison(self.take("word"))
+
+    def value(self):
+        kind, text = self.peek()
+        if kind not in ("string", "word"):
+            raise self.error()
+        self.position += 1
+        return parse_value(text)
+
+    def comparison(self, column):
+        kind, text = self.peek()
+        if kind == "op":
+            self.position += 1
+            op = "!=" if text == "<>" else text
+            return ("cmp", column, op, self.value())
+
+        negated = self.accept("keyword", "not")
+        if self.accept("keyword", "in"):
+            self.take("punct", "(")
+            values = [self.value()]
+            while self.accept("punct", ","):
+                values.append(self.value())
+            self.take("punct", ")")
+            return ("in", column, tuple(values), negated)
+        if self.accept("keyword", "like"):
+            return ("like", column, self.value(), negated)
+        raise self.error()
 
 
 def where_clause_parser(where_clause):
     """
     Парсер условия WHERE в командах SELECT, DELETE, UPDATE.
+    Поддерживает =, !=, <, <=, >, >=, IN, LIKE, AND, OR, NOT и скобки.
     """
     if not where_clause:
         return None
 
     where_clause = where_clause.strip()
-
-    # group1 [a-zA-Z0-9_] + any number of spaces + =
-    # + any number of spaces + group2 [a-zA-Z0-9_] except for \n
-    match = re.match(r"(\w+)\s*=\s*(.+)", where_clause)
-
-    if not match:
-        raise ValueError(f"Ошибка: некорректное условие '{where_clause}'")
-
-    column = match.group(1)
-    value = match.group(2)
-    value_parsed = parse_value(value)
-
-    return {column: value_parsed}
+    return Condition(_WhereParser(where_clause).parse())
 
 def set_clause_parser(set_clause):
     """
@@ -61,6 +200,10 @@ def parse_value(value):
     """
     value_str = value.strip()
 
+    # плейсхолдер шаблона команды (?0, ?1, ...)
+    if value_str.startswith("?") and value_str[1:].isdigit():
+        return Param(int(value_str[1:]))
+
     # строки в кавычках
     if (value_str.startswith('"') and value_str.endswith('"')) or \
             (value_str.startswith("'") and value_str.endswith("'")):
@@ -81,6 +224,9 @@ def parse_value(value):
         # если не удалось распарсить возвращаем как строку
         return value_str
 
+# значение INSERT: строка в кавычках или слово до пробела/запятой
+_VALUE_TOKEN = re.compile(r""""[^"]*"|'[^']*'|[^\s,"']+""")
+
 def parse_values(values):
     """
     Парсер значений, подаваемых в скобках для команды INSERT.
@@ -90,24 +236,38 @@ def parse_values(values):
     if values_str.startswith("(") and values_str.endswith(")"):
         values_str = values_str[1:-1]
 
-    # разбираем с shlex
-    values = []
-    parts = shlex.split(values_str)
+    # запятые и пробелы вне кавычек - разделители
+    return [parse_value(part) for part in _VALUE_TOKEN.findall(values_str)]
 
-    for part in parts:
-        # убираем запятые
-        part = part.rstrip(",")
-        if part:
-            values.append(parse_value(part))
+# кортеж значений в скобках (скобки и запятые в кавычках не учитываются)
+# и следующая за ним запятая или конец строки
+_VALUES_TUPLE = re.compile(r"""\s*\(((?:"[^"]*"|'[^']*'|[^()"'])*)\)\s*(,|$)""")
 
-    return values
+def parse_value_rows(values_str):
+    """
+    Парсер списка кортежей INSERT: (...), (...), ...
+    Значения без скобок считаются одним кортежем.
+    """
+    values_str = values_str.strip()
+    if not values_str.startswith("("):
+        return [parse_values(values_str)]
+
+    rows = []
+    position = 0
+    while position < len(values_str):
+        match = _VALUES_TUPLE.match(values_str, position)
+        if not match or (match.group(2) and match.end() == len(values_str)):
+            raise ValueError("Некорректный список значений.")
+        rows.append(parse_values(match.group(1)))
+        position = match.end()
+    return rows
 
 # парсеры команд
 
 @handle_db_errors
 def parse_insert_command(user_input):
     """
-    Парсит команду INSERT.
+    Парсит команду INSERT (один или несколько кортежей).
     """
     match = re.match(r"insert\s+into\s+(\w+)\s+values\s*(.+)",
                      user_input, re.IGNORECASE)
@@ -116,25 +276,77 @@ def parse_insert_command(user_input):
 
     table_name = match.group(1)
     values_str = match.group(2)
-    values = parse_values(values_str)
+    rows = parse_value_rows(values_str)
 
-    return table_name, values
+    return table_name, rows
+
+def parse_select_list(select_str):
+    """
+    Парсер списка выборки SELECT: столбцы и агрегатные функции
+    count(*), count(col), sum(col), min(col), max(col), avg(col).
+    Возвращает None для '*' (все столбцы).
+    """
+    if select_str is None or select_str.strip() == "*":
+        return None
+
+    items = []
+    for part in select_str.split(","):
+        part = part.strip()
+        match = re.fullmatch(r"(\w+)\s*\(\s*(\*|\w+)\s*\)", part)
+        if match:
+            func = match.group(1).lower()
+            if func not in AGGREGATE_FUNCTIONS:
+                raise ValueError(f"неизвестная функция '{match.group(1)}'")
+            if match.group(2) == "*" and func != "count":
+                raise ValueError(f"'{func}(*)' не поддерживается")
+            items.append((func, match.group(2)))
+        elif re.fullmatch(r"\w+", part):
+            items.append(("column", part))
+        else:
+            raise ValueError(f"некорректный элемент выборки '{part}'")
+    return items
+
+def select_label(item):
+    """Заголовок столбца результата для элемента выборки."""
+    kind, argument = item
+    return argument if kind == "column" else f"{kind}({argument})"
 
 @handle_db_errors
 def parse_select_command(user_input):
     """
     Парсит команду SELECT.
     """
-    match = re.match(r"select\s+from\s+(\w+)(?:\s+where\s+(.+))?",
+    match = re.match(r"select\s+(?:(.+?)\s+)?from\s+(\w+)(?:\s+where\s+(.+?))?"
+                     r"(?:\s+group\s+by\s+(\w+(?:\s*,\s*\w+)*))?"
+                     r"(?:\s+order\s+by\s+(\w+(?:\s*\(\s*[\w*]+\s*\))?)"
+                     r"(?:\s+(asc|desc))?)?"
+                     r"(?:\s+limit\s+(\d+|\?\d+))?"
+                     r"(?:\s+offset\s+(\d+|\?\d+))?\s*$",
                      user_input, re.IGNORECASE)
     if not match:
         raise ValueError("Некорректный формат команды.")
 
-    table_name = match.group(1)
-    where_str = match.group(2)
+    table_name = match.group(2)
+    where_str = match.group(3)
     where_clause = where_clause_parser(where_str) if where_str else None
-
-    return table_name, where_clause
+    group_str = match.group(4)
+    order_str = match.group(5)
+
+    # дополнительные параметры запроса
+    options = {
+        "columns": parse_select_list(match.group(1)),
+        "group_by": ([column.strip() for column in group_str.split(",")]
+                     if group_str else []),
+        # (столбец или заголовок агрегата, по убыванию); заголовок
+        # строится так же, как у элементов выборки, чтобы они совпадали
+        "order_by": ((select_label(parse_select_list(order_str)[0]),
+                      (match.group(6) or "").lower() == "desc")
+                     if order_str else None),
+        "limit": parse_value(match.group(7)) if match.group(7) else None,
+        "offset": parse_value(match.group(8)) if match.group(8) else 0,
+    }
+
+    return table_name, where_clause, options
 
 @handle_db_errors
 def parse_update_command(user_input):
@@ -169,4 +381,166 @@ def parse_delete_command(user_input):
     where_str = match.group(2)
     where_clause = where_clause_parser(where_str)
 
-    return table_name, where_clause
\ No newline at end of file
+    return table_name, where_clause
+
+# кэш разобранных команд
+
+# литералы и пробелы в тексте команды: строка в кавычках, число,
+# плейсхолдер ?, пробелы, которые нужно схлопнуть (одиночный
+# пробел оставляем как есть, без вызова замены); опережающая проверка
+# первого символа отсекает остальные позиции без перебора альтернатив.
+# Число заменяется, только если это слово целиком (вокруг пробелы,
+# скобки, запятые): в 2024-01-15, 12:30 или A-12 числа - часть значения;
+# ? может стоять и сразу после оператора сравнения (b=?)
+_STATEMENT_LITERAL = re.compile(r"""(?=["'\d?\s-])(?:
+    (?P<string>"[^"]*"|'[^']*')
+  | (?<![^\s(),])(?P<number>-?\d+(?:\.\d+)?)(?![^\s(),])
+  | (?<![^\s(),=<>!])(?P<param>\?)(?![^\s(),])
+  | (?P<space>\s{2,}|[^\S ])
+)""", re.VERBOSE)
+
+_STATEMENT_PARSERS = {
+    "insert": parse_insert_command,
+    "select": parse_select_command,
+    "update": parse_update_command,
+    "delete": parse_delete_command,
+}
+STATEMENT_COMMANDS = set(_STATEMENT_PARSERS)
+
+
+def normalize_statement(user_input):
+    """
+    Приводит команду к шаблону: лишние пробелы схлопываются,
+    литералы (строки в кавычках, числа) и явные ? заменяются
+    на пронумерованные плейсхолдеры ?0, ?1, ...
+    Возвращает (шаблон, аргументы), где аргумент - ("literal", текст)
+    или ("param", номер явного параметра).
+    """
+    arguments = []
+    explicit = 0
+
+    def replace(match):
+        nonlocal explicit
+        kind = match.lastgroup
+        if kind == "space":
+            return " "
+        placeholder = f"?{len(arguments)}"
+        if kind == "param":
+            arguments.append(("param", explicit))
+            explicit += 1
+        else:
+            arguments.append(("literal", match.group()))
+        return placeholder
+
+    template = _STATEMENT_LITERAL.sub(replace, user_input.strip())
+    return template, arguments
+
+
+def _binder(parsed):
+    """
+    Строит по шаблону функцию values -> результат разбора с подставленными
+    значениями. Части шаблона без плейсхолдеров переиспользуются как есть.
+    Возвращает None, если плейсхолдеров нет.
+    """
+    if isinstance(parsed, Param):
+        index = parsed.index
+        return lambda values: values[index]
+
+    if isinstance(parsed, Condition):
+        bind = _binder(parsed.tree)
+        if bind is None:
+            return None
+        return lambda values: Condition(bind(values))
+
+    if isinstance(parsed, dict):
+        parts = [(key, value, _binder(value)) for key, value in parsed.items()]
+        if not any(bind for _, _, bind in parts):
+            return None
+        return lambda values: {key: value if bind is None else bind(values)
+                               for key, value, bind in parts}
+
+    if isinstance(parsed, (tuple, list)):
+        parts = [(item, _binder(item)) for item in parsed]
+        if not any(bind for _, bind in parts):
+            return None
+        make = type(parsed)
+        return lambda values: make([item if bind is None else bind(values)
+                                    for item, bind in parts])
+
+    return None
+
+
+class StatementCache:
+    """
+    LRU-кэш разобранных команд (шаблон -> результат разбора и функция
+    подстановки значений).
+    Команды одной формы с разными литералами разбираются один раз.
+    """
+
+    def __init__(self, max_entries=STATEMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, command, template):
+        """(результат разбора, функция подстановки) или None."""
+        entry = self.entries.get((command, template))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end((command, template))
+        self.hits += 1
+        return entry
+
+    def put(self, command, template, entry):
+        """Запоминает результат разбора шаблона."""
+        self.entries[(command, template)] = entry
+        self.entries.move_to_end((command, template))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Статистика кэша команд."""
+        return {"entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses}
+
+
+statement_cache = StatementCache()
+
+
+def parse_statement(command, user_input, params=None):
+    """
+    Разбирает команду insert/select/update/delete через кэш шаблонов.
+    params - значения для явных плейсхолдеров ? (по порядку).
+    Возвращает результат соответствующего parse_*_command или None
+    при ошибке разбора (сообщение уже выведено).
+    """
+    template, arguments = normalize_statement(user_input)
+    params = list(params or [])
+
+    explicit = sum(1 for kind, _ in arguments if kind == "param")
+    if explicit != len(params):
+        print(f"Ошибка: ожидается параметров: {explicit}, передано: {len(params)}.")
+        return None
+
+    if not explicit and len(arguments) > STATEMENT_CACHE_MAX_LITERALS:
+        return _STATEMENT_PARSERS[command](user_input)
+
+    entry = statement_cache.get(command, template)
+    if entry is None:
+        parser = _STATEMENT_PARSERS[command]
+        try:
+            parsed = parser.__wrapped__(template)
+        except Exception:
+            # сообщение об ошибке выводим по исходному тексту команды
+            return parser(user_input)
+        entry = (parsed, _binder(parsed))
+        statement_cache.put(command, template, entry)
+
+    parsed, bind = entry
+    if bind is None:
+        return parsed
+    return bind([params[value] if kind == "param" else parse_value(value)
+                 for kind, value in arguments])
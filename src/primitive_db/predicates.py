@@ -0,0 +1,402 @@
+# src/primitive_db/predicates.py
+import json
+import operator
+import re
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+from itertools import compress, count
+
+from .columnar import IntColumn, ObjectColumn, StrColumn
+from .indexes import SortedIndex
+
+# узлы дерева условия:
+# ("cmp", столбец, оператор, значение)
+# ("in", столбец, (значения, ...), отрицание)
+# ("like", столбец, шаблон, отрицание)
+# ("and", [узлы]), ("or", [узлы]), ("not", узел)
+
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+RANGE_OPERATORS = {"<", "<=", ">", ">="}
+
+# типы значений, которые можно сравнивать на больше/меньше со столбцом
+_ORDERED_TYPES = {
+    "int": (int, float),
+    "bool": (bool, int),
+    "str": (str,),
+}
+
+
+def _literal(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        # кавычки внутри строки экранируются: иначе разные условия
+        # давали бы один текст и один ключ кэша
+        return json.dumps(value, ensure_ascii=False)
+    return repr(value)
+
+
+def _format(node, parent=None):
+    kind = node[0]
+    if kind == "cmp":
+        _, column, op, value = node
+        return f"{column} {op} {_literal(value)}"
+    if kind == "in":
+        _, column, values, negated = node
+        keyword = "NOT IN" if negated else "IN"
+        return f"{column} {keyword} ({', '.join(map(_literal, values))})"
+    if kind == "like":
+        _, column, pattern, negated = node
+        keyword = "NOT LIKE" if negated else "LIKE"
+        return f"{column} {keyword} {_literal(pattern)}"
+    if kind == "not":
+        return f"NOT {_format(node[1], kind)}"
+
+    text = f" {kind.upper()} ".join(_format(child, kind) for child in node[1])
+    # скобки нужны, только если приоритет родителя выше
+    if parent in ("and", "not") and (kind == "or" or parent == "not"):
+        return f"({text})"
+    return text
+
+
+class Condition:
+    """
+    Разобранное условие WHERE. Строковое представление нормализовано
+    (одинаковые условия дают одинаковый текст) и годится как ключ кэша.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    @cached_property
+    def text(self):
+        """Нормализованный текст условия (строится при первом обращении)."""
+        return _format(self.tree)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return self.text
+
+    def __eq__(self, other):
+        return isinstance(other, Condition) and self.tree == other.tree
+
+    def __hash__(self):
+        return hash(self.text)
+
+
+def _like_regex(pattern):
+    """
+    Переводит шаблон LIKE (% - любая строка, _ - один символ) в regex.
+    """
+    parts = []
+    for char in pattern:
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def _value_test(node, column_type):
+    """
+    Компилирует лист дерева в проверку одного значения столбца.
+    """
+    kind = node[0]
+    if kind == "cmp":
+        _, column, op, value = node
+        if op in RANGE_OPERATORS:
+            allowed = _ORDERED_TYPES.get(column_type)
+            if allowed is not None and not isinstance(value, allowed):
+                raise ValueError(f"значение {_literal(value)} нельзя сравнивать " +
+                                 f"со столбцом '{column}' типа '{column_type}'")
+        compare = COMPARISONS[op]
+        return lambda item: compare(item, value)
+
+    if kind == "in":
+        values = frozenset(node[2])
+        if node[3]:
+            return lambda item: item not in values
+        return lambda item: item in values
+
+    if not isinstance(node[2], str):
+        raise ValueError(f"шаблон LIKE должен быть строкой: {_literal(node[2])}")
+    regex = _like_regex(node[2])
+    if node[3]:
+        return lambda item: not (isinstance(item, str) and regex.fullmatch(item))
+    return lambda item: isinstance(item, str) and regex.fullmatch(item) is not None
+
+
+def _safe(test):
+    # в нетипизированном столбце могут быть несравнимые значения
+    def wrapper(item):
+        try:
+            return test(item)
+        except TypeError:
+            return False
+    return wrapper
+
+
+def _leaf_column(node, table_data):
+    column_name = node[1]
+    if column_name not in table_data.columns:
+        raise ValueError(f"столбец '{column_name}' не найден в таблице")
+
+    column = table_data.columns[column_name]
+    test = _value_test(node, table_data.schema.get(column_name))
+    if isinstance(column, ObjectColumn):
+        test = _safe(test)
+    return column, test
+
+
+def compile_test(tree, table_data):
+    """
+    Компилирует условие один раз в функцию позиция -> bool.
+    Для строковых столбцов условие проверяется по словарю один раз
+    на уникальную строку, а по позиции сравнивается только код.
+    """
+    kind = tree[0]
+
+    if kind in ("and", "or"):
+        tests = [compile_test(child, table_data) for child in tree[1]]
+        if len(tests) == 1:
+            return tests[0]
+        if len(tests) == 2:
+            # самый частый случай - без генератора на каждую позицию
+            first, second = tests
+            if kind == "and":
+                return lambda position: first(position) and second(position)
+            return lambda position: first(position) or second(position)
+        if kind == "and":
+            return lambda position: all(test(position) for test in tests)
+        return lambda position: any(test(position) for test in tests)
+    if kind == "not":
+        test = compile_test(tree[1], table_data)
+        return lambda position: not test(position)
+
+    column, test = _leaf_column(tree, table_data)
+    if isinstance(column, StrColumn):
+        codes = column.codes
+        matched = {code for code, string in enumerate(column.strings)
+                   if test(string)}
+        return lambda position: codes[position] in matched
+
+    get = column.get
+    return lambda position: test(get(position))
+
+
+def _scan_leaf(tree, table_data):
+    """
+    Проход по одному столбцу без сборки кортежей: лениво отдает позиции.
+    """
+    column, test = _leaf_column(tree, table_data)
+    if isinstance(column, StrColumn):
+        matched = {code for code, string in enumerate(column.strings)
+                   if test(string)}
+        return compress(count(), map(matched.__contains__, column.codes))
+    return compress(count(), map(test, column.values()))
+
+
+def _matching_set(tree, table_data):
+    """
+    Множество позиций, вычисленное по столбцам: каждое простое условие
+    проверяется проходом по своему столбцу, а AND/OR/NOT сводятся
+    к операциям над множествами.
+    """
+    kind = tree[0]
+    if kind == "and":
+        sets = sorted((_matching_set(child, table_data) for child in tree[1]),
+                      key=len)
+        return sets[0].intersection(*sets[1:])
+    if kind == "or":
+        return set().union(*(_matching_set(child, table_data)
+                             for child in tree[1]))
+    if kind == "not":
+        return set(range(len(table_data))) - _matching_set(tree[1], table_data)
+    return set(_scan_leaf(tree, table_data))
+
+
+def scan_plan(tree, table_data):
+    """
+    План проверки условия по частям таблицы в других процессах: дерево,
+    в котором условия по строковым столбцам заменены множествами подходящих
+    кодов словаря ("codes", столбец, коды), а остальные простые условия -
+    узлами ("values", столбец, условие, тип). План не содержит функций,
+    поэтому передается в процесс целиком. None - если условие затрагивает
+    нетипизированный столбец (его нельзя разделить между процессами).
+    """
+    kind = tree[0]
+    if kind in ("and", "or"):
+        children = [scan_plan(child, table_data) for child in tree[1]]
+        if any(child is None for child in children):
+            return None
+        return (kind, children)
+    if kind == "not":
+        child = scan_plan(tree[1], table_data)
+        return None if child is None else ("not", child)
+
+    column, test = _leaf_column(tree, table_data)
+    if isinstance(column, StrColumn):
+        matched = frozenset(code for code, string in enumerate(column.strings)
+                            if test(string))
+        return ("codes", tree[1], matched)
+    if isinstance(column, ObjectColumn):
+        return None
+    return ("values", tree[1], tree, table_data.schema.get(tree[1]))
+
+
+def _bitwise(op, first, second):
+    # флаги - байты 0/1, поэтому операция над числами дает побайтовую
+    return op(int.from_bytes(first, "little"),
+              int.from_bytes(second, "little")).to_bytes(len(first), "little")
+
+
+def scan_flags(plan, columns, start, stop):
+    """
+    Проверяет условие по плану на позициях [start, stop): возвращает
+    байты 0/1 по одному на позицию. columns - столбец -> массив значений
+    (для строковых - кодов), например memoryview общей памяти.
+    """
+    kind = plan[0]
+    if kind in ("and", "or"):
+        op, stop_value = (operator.and_, 1) if kind == "and" else (operator.or_, 0)
+        result = None
+        for child in plan[1]:
+            flags = scan_flags(child, columns, start, stop)
+            result = flags if result is None else _bitwise(op, result, flags)
+            if stop_value not in result:
+                # AND уже ложно на всех позициях, OR - истинно
+                break
+        return result
+    if kind == "not":
+        flags = scan_flags(plan[1], columns, start, stop)
+        return _bitwise(operator.xor, flags, b"\x01" * len(flags))
+    if kind == "codes":
+        _, column_name, matched = plan
+        return bytes(map(matched.__contains__, columns[column_name][start:stop]))
+
+    _, column_name, node, column_type = plan
+    test = _value_test(node, column_type)
+    return bytes(map(test, columns[column_name][start:stop]))
+
+
+def _id_range(tree, table_data):
+    """
+    Позиции по диапазону ID двоичным поиском: ID выдаются по возрастанию,
+    а новые кортежи всегда добавляются в конец, поэтому столбец ID упорядочен.
+    """
+    _, _, op, value = tree
+    column = table_data.columns["ID"]
+    if (not isinstance(column, IntColumn) or isinstance(value, bool)
+            or not isinstance(value, (int, float))):
+        return None
+
+    data = column.data
+    if op == "<":
+        return range(0, bisect_left(data, value))
+    if op == "<=":
+        return range(0, bisect_right(data, value))
+    if op == ">":
+        return range(bisect_right(data, value), len(data))
+    return range(bisect_left(data, value), len(data))
+
+
+def _indexed_positions(tree, table_data, indexes):
+    """
+    Позиции по индексам (упорядоченные), если условие можно
+    вычислить без полного прохода; иначе None.
+    """
+    kind = tree[0]
+    primary = indexes.get("ID")
+    if primary is None:
+        return None
+
+    if kind == "and":
+        for number, child in enumerate(tree[1]):
+            positions = _indexed_positions(child, table_data, indexes)
+            if positions is not None:
+                rest = tree[1][:number] + tree[1][number + 1:]
+                test = compile_test(("and", rest), table_data)
+                return [position for position in positions if test(position)]
+        return None
+
+    if kind == "or":
+        matched = set()
+        for child in tree[1]:
+            positions = _indexed_positions(child, table_data, indexes)
+            if positions is None:
+                return None
+            matched.update(positions)
+        return sorted(matched)
+
+    if kind == "cmp":
+        _, column_name, op, value = tree
+        index = indexes.get(column_name)
+        if op == "=" and index is not None:
+            ids = index.lookup(value)
+        elif op in RANGE_OPERATORS and isinstance(index, SortedIndex):
+            _value_test(tree, table_data.schema.get(column_name))  # проверка типа
+            ids = index.range(
+                low=value if op in (">", ">=") else None,
+                high=value if op in ("<", "<=") else None,
+                include_low=op == ">=",
+                include_high=op == "<=")
+        elif op in RANGE_OPERATORS and column_name == "ID":
+            return _id_range(tree, table_data)
+        else:
+            return None
+        return sorted(primary.position(id_) for id_ in ids)
+
+    if kind == "in" and not tree[3] and tree[1] in indexes:
+        index = indexes[tree[1]]
+        ids = set()
+        for value in tree[2]:
+            ids.update(index.lookup(value))
+        return sorted(primary.position(id_) for id_ in ids)
+
+    return None
+
+
+def iter_matching(table_data, condition, indexes=None, full_scan=None):
+    """
+    Лениво перебирает позиции кортежей, удовлетворяющих условию.
+    Порядок выбора плана: индексы (равенство, IN, диапазон по
+    упорядоченному индексу или по ID), затем full_scan (параллельный
+    проход, см. scan.py), затем проход по столбцу одного условия из AND
+    с проверкой остальных, затем OR/NOT по столбцам.
+    full_scan - функция (дерево, таблица) -> позиции по возрастанию
+    или None, если проход нужно выполнить в текущем процессе.
+    """
+    tree = condition.tree
+    indexes = indexes or {}
+
+    positions = _indexed_positions(tree, table_data, indexes)
+    if positions is not None:
+        return iter(positions)
+
+    if full_scan is not None:
+        positions = full_scan(tree, table_data)
+        if positions is not None:
+            return iter(positions)
+
+    if tree[0] in ("cmp", "in", "like"):
+        return _scan_leaf(tree, table_data)
+
+    if tree[0] == "and":
+        for number, child in enumerate(tree[1]):
+            if child[0] in ("cmp", "in", "like"):
+                rest = tree[1][:number] + tree[1][number + 1:]
+                return filter(compile_test(("and", rest), table_data),
+                              _scan_leaf(child, table_data))
+
+    return iter(sorted(_matching_set(tree, table_data)))
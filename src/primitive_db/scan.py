@@ -0,0 +1,166 @@
+# src/primitive_db/scan.py
+import mmap
+import os
+from itertools import compress, count, repeat
+
+from .columnar import StrColumn
+from .constants import PARALLEL_SCAN_THRESHOLD, SCAN_CHUNKS_PER_WORKER, SCAN_WORKERS
+from .metrics import log, registry
+from .predicates import scan_flags, scan_plan
+
+# файлы общей памяти для параллельного прохода (в RAM, если есть /dev/shm)
+_SCAN_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# выравнивание столбцов в файле (размер самого длинного значения, int64)
+_ALIGNMENT = 8
+
+_scan_settings = {"workers": SCAN_WORKERS, "threshold": PARALLEL_SCAN_THRESHOLD}
+# пул процессов создается при первом параллельном проходе и переиспользуется
+_pool = {"executor": None, "workers": 0}
+
+
+def set_scan_workers(workers):
+    """
+    Задает число процессов параллельного прохода
+    (0 - по числу ядер, 1 - проход всегда в текущем процессе).
+    """
+    if workers < 0:
+        raise ValueError("Число процессов не может быть отрицательным.")
+    _scan_settings["workers"] = workers
+
+
+def set_scan_threshold(rows):
+    """
+    Задает минимальный размер таблицы (кортежей) для параллельного прохода.
+    """
+    if rows < 0:
+        raise ValueError("Порог параллельного прохода не может быть отрицательным.")
+    _scan_settings["threshold"] = rows
+
+
+def scan_workers():
+    """Число процессов параллельного прохода с учетом числа ядер."""
+    return _scan_settings["workers"] or os.cpu_count() or 1
+
+
+def _executor(workers):
+    if _pool["executor"] is None or _pool["workers"] != workers:
+        # multiprocessing и concurrent.futures нужны только для больших таблиц,
+        # поэтому не загружаются при запуске
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        shutdown_pool()
+        # fork небезопасен при работающих потоках (сервер, сброс на диск)
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
+        _pool["executor"] = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context(method))
+        _pool["workers"] = workers
+    return _pool["executor"]
+
+
+def shutdown_pool():
+    """Останавливает процессы параллельного прохода."""
+    if _pool["executor"] is not None:
+        _pool["executor"].shutdown(wait=True, cancel_futures=True)
+        _pool["executor"] = None
+        _pool["workers"] = 0
+
+
+def _plan_columns(plan, names):
+    kind = plan[0]
+    if kind in ("and", "or"):
+        for child in plan[1]:
+            _plan_columns(child, names)
+    elif kind == "not":
+        _plan_columns(plan[1], names)
+    else:
+        names.add(plan[1])
+    return names
+
+
+def _column_bytes(column):
+    """Массив значений столбца (для строк - кодов) как байты и его typecode."""
+    if isinstance(column, StrColumn):
+        data, typecode = column.codes, "i"
+    else:
+        data, typecode = column.data, column.typecode
+    return memoryview(data).cast("B"), typecode
+
+
+def _evaluate_mapped(buffer, layout, plan, start, stop):
+    # представления памяти живут только внутри функции: mmap можно закрыть
+    view = memoryview(buffer)
+    columns = {name: view[offset:offset + size].cast(typecode)
+               for name, (offset, size, typecode) in layout.items()}
+    return scan_flags(plan, columns, start, stop)
+
+
+def _scan_chunk(path, layout, plan, result_offset, start, stop):
+    """
+    Выполняется в процессе пула: отображает файл общей памяти, проверяет
+    условие на позициях [start, stop) и записывает флаги в область результата.
+    """
+    with open(path, "r+b") as file, mmap.mmap(file.fileno(), 0) as buffer:
+        flags = _evaluate_mapped(buffer, layout, plan, start, stop)
+        buffer[result_offset + start:result_offset + stop] = flags
+
+
+def parallel_scan(tree, table_data):
+    """
+    Полный проход по таблице в нескольких процессах. Столбцы условия
+    копируются одним блоком в файл общей памяти (без сериализации
+    кортежей), таблица делится на части по позициям, каждый процесс
+    отображает файл и пишет флаги своей части в общую область результата.
+    Возвращает позиции по возрастанию или None, если таблица меньше
+    порога, процесс один или условие нельзя проверить вне процесса.
+    """
+    rows = len(table_data)
+    workers = scan_workers()
+    if workers < 2 or rows < _scan_settings["threshold"]:
+        return None
+
+    plan = scan_plan(tree, table_data)
+    if plan is None:
+        return None
+
+    layout = {}
+    segments = []
+    offset = 0
+    for name in sorted(_plan_columns(plan, set())):
+        data, typecode = _column_bytes(table_data.columns[name])
+        layout[name] = (offset, data.nbytes, typecode)
+        segments.append((offset, data))
+        offset += -(-data.nbytes // _ALIGNMENT) * _ALIGNMENT
+    result_offset = offset
+
+    import tempfile
+    from concurrent.futures.process import BrokenProcessPool
+
+    chunk = -(-rows // (workers * SCAN_CHUNKS_PER_WORKER))
+    starts = range(0, rows, chunk)
+    stops = [min(start + chunk, rows) for start in starts]
+
+    fd, path = tempfile.mkstemp(prefix="primitive_db_scan_", dir=_SCAN_DIR)
+    try:
+        os.ftruncate(fd, result_offset + rows)
+        with mmap.mmap(fd, result_offset + rows) as buffer:
+            for segment_offset, data in segments:
+                buffer[segment_offset:segment_offset + data.nbytes] = data
+
+            # map возвращает результаты по порядку и пробрасывает ошибки частей
+            for _ in _executor(workers).map(_scan_chunk, repeat(path), repeat(layout),
+                                            repeat(plan), repeat(result_offset),
+                                            starts, stops):
+                pass
+            flags = buffer[result_offset:result_offset + rows]
+    except (OSError, BrokenProcessPool) as e:
+        log(f"Параллельный проход недоступен, проход в текущем процессе: {e}")
+        shutdown_pool()
+        return None
+    finally:
+        os.close(fd)
+        os.unlink(path)
+
+    registry.increment("scan.parallel")
+    return list(compress(count(), flags))
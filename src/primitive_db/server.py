@@ -0,0 +1,199 @@
+# src/primitive_db/server.py
+import asyncio
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from .constants import SERVER_HOST, SERVER_MAX_LINE, SERVER_PORT
+from .decorators import set_auto_confirm
+from .engine import WRITE_COMMANDS, execute_command, save_changes
+from .metrics import is_verbose, set_verbose
+from .session import TableManager
+
+# транзакция в сессии одна на всех клиентов, поэтому на сервере недоступна
+TRANSACTION_COMMANDS = {"begin", "commit", "rollback"}
+
+
+def parse_request(line):
+    """
+    Разбирает строку запроса: JSON-объект {"command": ..., "params": [...],
+    "verbose": ...} или просто текст команды.
+    Возвращает (команда, параметры, выводить ли служебные сообщения).
+    """
+    line = line.strip()
+    if not line.startswith("{"):
+        return line, None, False
+
+    request = json.loads(line)
+    command = request.get("command")
+    params = request.get("params")
+    verbose = request.get("verbose", False)
+    if not isinstance(command, str):
+        raise ValueError("в запросе нет строки 'command'")
+    if params is not None and not isinstance(params, list):
+        raise ValueError("'params' должен быть списком")
+    if not isinstance(verbose, bool):
+        raise ValueError("'verbose' должен быть true или false")
+    return command, params, verbose
+
+
+def encode_response(output, keep_open=True):
+    """
+    Строка ответа: {"ok": ..., "output": ..., "close": ...}.
+    ok ложно, если команда вывела сообщение об ошибке.
+    """
+    ok = not any(line.startswith("Ошибка") for line in output.splitlines())
+    response = {"ok": ok, "output": output}
+    if not keep_open:
+        response["close"] = True
+    return (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class DatabaseServer:
+    """
+    Сервер базы данных: все клиенты работают с одной сессией, таблицы
+    которой держатся в памяти. Команды выполняются по очереди в цикле
+    событий, а сброс изменений на диск - в отдельном потоке: пока идет
+    запись, чтение (select, info, ...) продолжается, а следующая
+    изменяющая команда дожидается окончания сброса.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or TableManager(flush_policy="exit")
+        self.executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix="db-flush")
+        self.flushing = None
+
+    async def wait_flush(self):
+        """
+        Дожидается окончания сброса на диск. Пока шло ожидание, другая
+        изменяющая команда могла запустить новый сброс - ждем и его.
+        Возвращает ошибку сброса или None; незаписанные изменения
+        остаются в сессии и записываются следующим сбросом.
+        """
+        error = None
+        while self.flushing is not None:
+            flushing = self.flushing
+            try:
+                await flushing
+            except Exception as e:
+                error = e
+            finally:
+                if self.flushing is flushing:
+                    self.flushing = None
+        return error
+
+    def _flush(self, changes):
+        # выполняется в потоке сброса
+        self.session.write_changes(changes)
+        self.session.writer.release()
+
+    def start_flush(self):
+        """
+        Запускает сброс накопленных изменений в потоке. Снимок изменений
+        собирается здесь, в цикле событий, - поток не обходит словари
+        сессии, которые тем временем пополняют читающие команды.
+        """
+        loop = asyncio.get_running_loop()
+        changes = self.session.pending_changes()
+        self.flushing = loop.run_in_executor(self.executor, self._flush, changes)
+
+    async def execute(self, command, params=None, verbose=False):
+        """
+        Выполняет команду и возвращает (вывод, продолжать ли соединение).
+        Служебные сообщения (время, кэш) попадают в вывод, только если
+        клиент запросил их (verbose).
+        """
+        words = command.split(None, 1)
+        name = words[0].lower() if words else ""
+
+        if name in TRANSACTION_COMMANDS:
+            return "Ошибка: транзакции недоступны в режиме сервера.\n", True
+
+        writes = name in WRITE_COMMANDS
+        if writes:
+            # данные меняются только после того, как записаны предыдущие
+            error = await self.wait_flush()
+            if error is not None:
+                return ("Ошибка: предыдущие изменения не сохранены на диск " +
+                        f"('{error}'); команда не выполнена, повторите ее.\n", True)
+
+        output = io.StringIO()
+        previous = is_verbose()
+        set_verbose(verbose)
+        try:
+            with redirect_stdout(output):
+                keep_open = execute_command(command, self.session, params)
+        finally:
+            set_verbose(previous)
+
+        if writes:
+            self.start_flush()
+        return output.getvalue(), keep_open
+
+    async def handle_client(self, reader, writer):
+        """Обслуживает одно соединение: запрос - строка, ответ - строка."""
+        try:
+            while line := await reader.readline():
+                try:
+                    command, params, verbose = parse_request(line.decode("utf-8"))
+                except ValueError as e:  # в т.ч. JSONDecodeError
+                    writer.write(encode_response(f"Ошибка: некорректный запрос: {e}\n"))
+                    await writer.drain()
+                    continue
+
+                if not command:
+                    continue
+
+                output, keep_open = await self.execute(command, params, verbose)
+                writer.write(encode_response(output, keep_open))
+                await writer.drain()
+                if not keep_open:
+                    break
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            # клиент отключился или прислал слишком длинную строку
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        """Дописывает изменения на диск и освобождает ресурсы."""
+        error = await self.wait_flush()
+        if error is not None:
+            print(f"Ошибка: изменения не сохранены на диск: '{error}'")
+        self.executor.shutdown(wait=True)
+        # close повторяет запись того, что не удалось записать
+        save_changes(self.session.close)
+
+
+async def _serve(host, port, unix_socket):
+    database = DatabaseServer()
+    if unix_socket:
+        server = await asyncio.start_unix_server(database.handle_client,
+                                                 path=unix_socket,
+                                                 limit=SERVER_MAX_LINE)
+        address = unix_socket
+    else:
+        server = await asyncio.start_server(database.handle_client, host, port,
+                                            limit=SERVER_MAX_LINE)
+        address = f"{host}:{port}"
+
+    print(f"Сервер базы данных запущен на {address}. Остановка - Ctrl+C.")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await database.close()
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, unix_socket=None):
+    """
+    Запускает сервер на TCP-порту или Unix-сокете.
+    Опасные операции на сервере подтверждаются автоматически.
+    """
+    set_auto_confirm(True)
+    try:
+        asyncio.run(_serve(host, port, unix_socket))
+    except KeyboardInterrupt:
+        print("\nСервер остановлен.")
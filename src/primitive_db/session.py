@@ -0,0 +1,478 @@
+# src/primitive_db/session.py
+import time
+from pathlib import Path
+
+from .binary import MappedTable
+from .columnar import ColumnarTable
+from .constants import (
+    DATA_DIR,
+    FLUSH_INTERVAL_MS,
+    FLUSH_POLICY,
+    INDEX_FILE,
+    METADATA_FILE,
+    SEQUENCE_FILE,
+    STORAGE_FILE,
+    TABLE_FORMATS,
+    TRANSACTION_FILE,
+    WRITER_LOCK_FILE,
+)
+from .indexes import build_indexes
+from .locking import FileLock, locked, table_lock_path
+from .metrics import registry
+from .utils import (
+    append_table_log,
+    delete_table_data,
+    load_metadata,
+    load_table,
+    load_transaction,
+    save_metadata,
+    save_table_data,
+    save_transaction,
+)
+
+FLUSH_POLICIES = {"command", "interval", "exit"}
+
+
+def file_signature(*paths):
+    """
+    Подпись файлов на диске (mtime и размер) для обнаружения изменений.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = Path(path).stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def recover_transaction(data_dir=DATA_DIR):
+    """
+    Доводит до конца транзакцию, прерванную сбоем после сохранения
+    ее изменений, но до их переноса в файлы таблиц.
+    Повторное применение безопасно: журнал накатывается по ID.
+    Файл транзакции может принадлежать процессу, который прямо сейчас
+    выполняет commit, поэтому восстановление идет под блокировкой записи.
+    Если запись не удалась, файл транзакции остается до следующей попытки.
+    """
+    if not Path(TRANSACTION_FILE).exists():
+        return
+
+    with locked(WRITER_LOCK_FILE, exclusive=True):
+        try:
+            _apply_transaction(data_dir)
+        except OSError as e:
+            print(f"Ошибка: прерванная транзакция не восстановлена: '{e}'. " +
+                  "Повторная попытка - перед следующей записью.")
+
+def _apply_transaction(data_dir):
+    """
+    Переносит изменения файла транзакции в файлы таблиц и удаляет его.
+    Вызывается под блокировкой записи; ошибка записи (OSError)
+    пробрасывается, файл транзакции при этом остается.
+    """
+    changes = load_transaction(TRANSACTION_FILE)
+    if changes is None:  # commit завершился, пока ждали блокировку
+        return
+
+    for table_name in changes["dropped"]:
+        with locked(table_lock_path(table_name, data_dir), exclusive=True):
+            delete_table_data(table_name, data_dir)
+    for filepath, data in changes["configs"]:
+        save_metadata(filepath, data)
+    for table_name, fmt, records in changes["tables"]:
+        with locked(table_lock_path(table_name, data_dir), exclusive=True):
+            append_table_log(table_name, records, None, data_dir, fmt)
+
+    Path(TRANSACTION_FILE).unlink(missing_ok=True)
+
+
+class TableManager:
+    """
+    Менеджер таблиц сессии: держит метаданные и данные таблиц в памяти,
+    перечитывает файлы только при их изменении на диске и сбрасывает
+    изменения по заданной политике (command / interval / exit).
+    Внутри транзакции изменения копятся в памяти до commit.
+
+    Несколько процессов могут работать с одними файлами: изменять данные
+    может только один из них (блокировка записи берется перед изменяющей
+    командой и снимается после сброса), а таблицы читаются и дописываются
+    под разделяемой / исключительной блокировкой файла таблицы.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, flush_policy=FLUSH_POLICY,
+                 flush_interval_ms=FLUSH_INTERVAL_MS):
+        if flush_policy not in FLUSH_POLICIES:
+            raise ValueError(f"Неизвестная политика сброса '{flush_policy}'")
+
+        self.data_dir = data_dir
+        self.flush_policy = flush_policy
+        self.flush_interval_ms = flush_interval_ms
+        self.last_flush = time.monotonic()
+
+        # файл -> [данные, подпись, признак изменения]
+        self.configs = {}
+        # таблица -> {"data", "indexes", "signature", "pending"}
+        self.tables = {}
+        # удаленные таблицы, файлы которых еще не стерты с диска
+        self.dropped = set()
+        self.in_transaction = False
+        # файл транзакции записан, но таблицы записаны не все
+        self.commit_started = False
+        self.writer = FileLock(WRITER_LOCK_FILE)
+
+        recover_transaction(self.data_dir)
+
+    # конфигурационные файлы (метаданные, индексы, счетчики ID, форматы)
+
+    def _config(self, filepath):
+        entry = self.configs.get(filepath)
+        if entry is not None and entry[2]:
+            # несохраненные изменения важнее файла на диске
+            return entry[0]
+
+        signature = file_signature(filepath)
+        if entry is None or entry[1] != signature:
+            entry = [load_metadata(filepath), signature, False]
+            self.configs[filepath] = entry
+        return entry[0]
+
+    def _mark_config(self, filepath, data):
+        self.configs[filepath] = [data, None, True]
+
+    @property
+    def metadata(self):
+        """Метаданные всех таблиц."""
+        return self._config(METADATA_FILE)
+
+    @property
+    def index_config(self):
+        """Конфигурация индексов всех таблиц."""
+        return self._config(INDEX_FILE)
+
+    @property
+    def sequences(self):
+        """Счетчики ID всех таблиц."""
+        return self._config(SEQUENCE_FILE)
+
+    @property
+    def storage_config(self):
+        """Форматы хранения таблиц."""
+        return self._config(STORAGE_FILE)
+
+    def table_format(self, table_name):
+        """Формат хранения таблицы на диске."""
+        return self.storage_config.get(table_name, "json")
+
+    def set_metadata(self, metadata):
+        """Помечает метаданные измененными."""
+        self._mark_config(METADATA_FILE, metadata)
+        # таблицы со сменившейся схемой нужно перечитать
+        for table_name in list(self.tables):
+            if self.tables[table_name]["data"].schema != metadata.get(table_name, {}):
+                del self.tables[table_name]
+
+    def set_index_config(self, index_config):
+        """Помечает конфигурацию индексов измененной."""
+        self._mark_config(INDEX_FILE, index_config)
+        # индексы таблиц нужно перестроить по новой конфигурации
+        for table_name, state in self.tables.items():
+            state["indexes"] = build_indexes(index_config.get(table_name),
+                                             state["data"])
+
+    def mark_sequences(self):
+        """Помечает счетчики ID измененными."""
+        self._mark_config(SEQUENCE_FILE, self.sequences)
+
+    # данные таблиц
+
+    def _table_signature(self, table_name):
+        paths = [Path(self.data_dir)/f"{table_name}{suffix}"
+                 for suffix in TABLE_FORMATS.values()]
+        return file_signature(*paths, Path(self.data_dir)/f"{table_name}.log")
+
+    def _table_lock(self, table_name):
+        return table_lock_path(table_name, self.data_dir)
+
+    def _table_state(self, table_name):
+        state = self.tables.get(table_name)
+        if state is not None and (state["pending"] or table_name in self.dropped):
+            return state
+
+        schema = self.metadata.get(table_name, {})
+        if table_name in self.dropped:
+            # на диске еще лежат файлы удаленной таблицы - не читаем их
+            table_data = ColumnarTable(schema)
+            state = {
+                "data": table_data,
+                "indexes": build_indexes(self.index_config.get(table_name),
+                                         table_data),
+                "signature": None,
+                "pending": [],
+            }
+            self.tables[table_name] = state
+            return state
+
+        signature = self._table_signature(table_name)
+        if state is None or state["signature"] != signature:
+            # под разделяемой блокировкой файлы таблицы не меняются:
+            # читается согласованный снимок с журналом, а отображенный
+            # через mmap файл остается прежним и после его подмены
+            with locked(self._table_lock(table_name)), registry.stage("load"):
+                signature = self._table_signature(table_name)
+                table_data = load_table(table_name, schema, self.data_dir,
+                                        self.table_format(table_name))
+            state = {
+                "data": table_data,
+                "indexes": build_indexes(self.index_config.get(table_name),
+                                         table_data),
+                "signature": signature,
+                "pending": [],
+            }
+            self.tables[table_name] = state
+        return state
+
+    def is_stale(self, table_name):
+        """
+        Изменил ли другой процесс файлы таблицы после ее загрузки.
+        """
+        state = self.tables.get(table_name)
+        if state is None or state["pending"] or table_name in self.dropped:
+            return False
+        return state["signature"] != self._table_signature(table_name)
+
+    def get_table(self, table_name, writable=False):
+        """
+        Возвращает данные таблицы и ее индексы.
+        Для изменения отображенная через mmap таблица копируется в память.
+        """
+        state = self._table_state(table_name)
+        if writable and isinstance(state["data"], MappedTable):
+            # позиции кортежей не меняются, индексы остаются верными;
+            # индекс ID ищет по самой таблице - переводим его на копию
+            state["data"] = state["data"].to_columnar()
+            state["indexes"]["ID"].build(state["data"])
+        return state["data"], state["indexes"]
+
+    def set_table(self, table_name, table_data, records):
+        """
+        Фиксирует новое состояние таблицы и записи для журнала.
+        """
+        state = self._table_state(table_name)
+        if state["data"] is not table_data:
+            state["indexes"]["ID"].build(table_data)
+        state["data"] = table_data
+        state["pending"].extend(records)
+
+    def drop_table(self, table_name):
+        """
+        Удаляет таблицу из памяти вместе с индексами и счетчиком.
+        Файлы таблицы стираются с диска при следующем сбросе.
+        """
+        self.tables.pop(table_name, None)
+        self.dropped.add(table_name)
+
+        for filepath in (INDEX_FILE, SEQUENCE_FILE, STORAGE_FILE):
+            config = self._config(filepath)
+            if config.pop(table_name, None) is not None:
+                self._mark_config(filepath, config)
+
+    def convert_table(self, table_name, storage_config):
+        """
+        Переписывает таблицу в формате из новой конфигурации хранения.
+        """
+        state = self._table_state(table_name)
+        fmt = storage_config.get(table_name, "json")
+
+        # снимок включает все изменения, журнал будет удален
+        with locked(self._table_lock(table_name), exclusive=True):
+            save_table_data(table_name, state["data"], self.data_dir, fmt)
+        state["pending"] = []
+        self._mark_config(STORAGE_FILE, storage_config)
+        # перечитаем таблицу уже в новом формате
+        self.tables.pop(table_name, None)
+
+    # сброс на диск
+
+    def pending_changes(self):
+        """
+        Снимок накопленных изменений для write_changes: (удаленные таблицы,
+        измененные конфигурации, таблицы с записями журнала). Собирается
+        в потоке команд: запись в другом потоке идет по снимку, а не по
+        словарям сессии, которые тем временем пополняют читающие команды.
+        """
+        dropped = sorted(self.dropped)
+        configs = [(filepath, entry) for filepath, entry in self.configs.items()
+                   if entry[2]]
+        tables = [(table_name, self.table_format(table_name), state)
+                  for table_name, state in self.tables.items() if state["pending"]]
+        return dropped, configs, tables
+
+    def write_changes(self, changes):
+        """
+        Записывает снимок изменений из pending_changes в файлы конфигураций
+        и таблиц. Может выполняться в другом потоке: изменяющие команды
+        ждут окончания записи. Признак изменения снимается с каждого
+        записанного файла, поэтому при ошибке (OSError) в памяти остается
+        только незаписанное - оно запишется при следующем сбросе.
+        """
+        dropped, configs, tables = changes
+        if dropped or configs or tables:
+            with registry.stage("save"):
+                # сначала стираем файлы удаленных таблиц: таблица с тем же
+                # именем могла быть создана заново
+                for table_name in dropped:
+                    with locked(self._table_lock(table_name), exclusive=True):
+                        delete_table_data(table_name, self.data_dir)
+                    self.dropped.discard(table_name)
+
+                for filepath, entry in configs:
+                    save_metadata(filepath, entry[0])
+                    entry[1] = file_signature(filepath)
+                    entry[2] = False
+
+                for table_name, fmt, state in tables:
+                    with locked(self._table_lock(table_name), exclusive=True):
+                        append_table_log(table_name, state["pending"], state["data"],
+                                         self.data_dir, fmt)
+                        state["signature"] = self._table_signature(table_name)
+                    state["pending"] = []
+        self.last_flush = time.monotonic()
+
+    def save(self):
+        """
+        Сохраняет накопленные изменения на диск, не освобождая блокировку
+        записи (промежуточный сброс посреди команды, например между
+        пачками import). Внутри транзакции ничего не делает.
+        """
+        if not self.in_transaction:
+            self.write_changes(self.pending_changes())
+
+    def flush(self):
+        """
+        Сохраняет все накопленные изменения на диск и освобождает
+        блокировку записи. Внутри транзакции ничего не делает -
+        изменения ждут commit.
+        """
+        if not self.in_transaction:
+            self.save()
+            self.writer.release()
+
+    def acquire_writer(self):
+        """
+        Получает блокировку записи перед изменяющей командой (другие
+        процессы в это время только читают). Держится до сброса изменений
+        на диск; при занятости дольше LOCK_TIMEOUT - LockTimeout.
+        Пока блокировки не было, предыдущий писатель мог упасть посреди
+        commit: его транзакция доводится до конца сразу после захвата,
+        иначе ее поздний повтор затер бы более новые изменения. Если это
+        не удалось (OSError), блокировка освобождается и запись запрещена.
+        """
+        if self.writer.held:
+            return
+
+        self.writer.acquire(exclusive=True)
+        if Path(TRANSACTION_FILE).exists():
+            try:
+                _apply_transaction(self.data_dir)
+            except OSError:
+                self.writer.release()
+                raise
+
+    def after_command(self):
+        """
+        Вызывается после каждой команды и сбрасывает изменения по политике.
+        """
+        match self.flush_policy:
+            case "command":
+                self.flush()
+            case "interval":
+                elapsed_ms = (time.monotonic() - self.last_flush) * 1000
+                if elapsed_ms >= self.flush_interval_ms:
+                    self.flush()
+
+    def idle_flush_delay(self):
+        """
+        Через сколько секунд сбросить изменения, если следующая команда
+        не придет (политика interval), или None - сбрасывать нечего.
+        """
+        if (self.flush_policy != "interval" or self.in_transaction
+                or not self.writer.held):
+            return None
+        elapsed = time.monotonic() - self.last_flush
+        return max(0.0, self.flush_interval_ms / 1000 - elapsed)
+
+    # транзакции
+
+    def begin(self):
+        """
+        Начинает транзакцию. Изменения, сделанные до нее, сохраняются сразу,
+        чтобы откат затрагивал только изменения транзакции.
+        """
+        self.write_changes(self.pending_changes())
+        self.in_transaction = True
+
+    def commit(self):
+        """
+        Фиксирует транзакцию одним сбросом на диск.
+        Изменения сначала атомарно сохраняются одним файлом
+        (временный файл + fsync + переименование), поэтому при сбое
+        во время записи таблиц они будут доведены до конца при запуске.
+        При ошибке записи (OSError) транзакция остается активной,
+        а файл транзакции - на диске; commit можно повторить.
+        """
+        changes = self.pending_changes()
+        dropped, configs, tables = changes
+        if dropped or configs or tables:
+            save_transaction(TRANSACTION_FILE, {
+                "configs": [[str(filepath), entry[0]] for filepath, entry in configs],
+                "tables": [(table_name, fmt, state["pending"])
+                           for table_name, fmt, state in tables],
+                "dropped": dropped,
+            })
+            self.commit_started = True
+            self.write_changes(changes)
+            Path(TRANSACTION_FILE).unlink(missing_ok=True)
+
+        self.commit_started = False
+        self.in_transaction = False
+        self.writer.release()
+
+    def rollback(self):
+        """
+        Отменяет транзакцию: отбрасывает накопленные изменения,
+        при следующем обращении таблицы перечитываются с диска.
+        Возвращает имена затронутых таблиц.
+        После начатой фиксации отменять уже нечего - часть таблиц
+        записана - и возникает RuntimeError.
+        """
+        if self.commit_started:
+            raise RuntimeError("фиксация транзакции уже начата, повторите commit.")
+
+        touched = ({table_name for table_name, state in self.tables.items()
+                    if state["pending"]} | self.dropped)
+
+        self.configs = {filepath: entry for filepath, entry in self.configs.items()
+                        if not entry[2]}
+        # данные и индексы в памяти могли измениться и без записей журнала
+        self.tables.clear()
+        self.dropped.clear()
+        self.in_transaction = False
+        self.writer.release()
+        return touched
+
+    def close(self):
+        """
+        Завершает сессию с сохранением изменений.
+        Незавершенная транзакция откатывается; прерванная фиксация
+        доводится до конца при следующем запуске по файлу транзакции.
+        """
+        if self.commit_started:
+            print("Фиксация транзакции не завершена, она будет " +
+                  "доведена до конца при следующем запуске.")
+            return
+        if self.in_transaction:
+            self.rollback()
+            print("Незавершенная транзакция отменена.")
+        self.flush()
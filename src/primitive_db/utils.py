@@ -1,14 +1,25 @@
+import csv
 import json
+import struct
+from itertools import islice
 from pathlib import Path
 
+from .binary import open_binary_table, save_binary_table
+from .columnar import ColumnarTable
+from .constants import LOG_COMPACT_MIN_BYTES, TABLE_FORMATS, TRANSFER_FORMATS
+from .fileio import append_write, atomic_write
+
+# общий кодировщик для построчной записи (не создается на каждый кортеж)
+_row_encoder = json.JSONEncoder(ensure_ascii=False)
+
 
 def load_metadata(filepath):
     """
     Загружает метаданные из JSON-файла.
     """
     try:
-        file = open(filepath, "r", encoding="utf-8")
-        return json.load(file)
+        with open(filepath, "r", encoding="utf-8") as file:
+            return json.load(file)
     except FileNotFoundError:
         return {}
     except Exception as e:
@@ -17,46 +28,277 @@ def load_metadata(filepath):
 
 def save_metadata(filepath, metadata):
     """
-    Сохраняет метаданные.
+    Сохраняет метаданные (атомарно, через временный файл).
+    Ошибка записи (OSError) пробрасывается вызывающему.
     """
-    # создаем директорию если ее нет
-    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-
-    try:
-        file = open(filepath, "w", encoding="utf-8")
+    with atomic_write(filepath, "config") as file:
         json.dump(metadata, file, indent=4, ensure_ascii=False)
-        file.close()
-    except Exception as e:
-        print(f"Ошибка при сохранении: '{e}'") # just in case
-        return
+
+def _snapshot_path(table_name, json_dir, fmt="json"):
+    """
+    Путь к снимку таблицы в заданном формате.
+    """
+    return Path(json_dir)/f"{table_name}{TABLE_FORMATS[fmt]}"
+
+def _log_path(table_name, json_dir):
+    """
+    Путь к журналу изменений (JSON-lines) таблицы.
+    """
+    return Path(json_dir)/f"{table_name}.log"
+
+def _log_records(log_path):
+    """
+    Перебирает записи журнала изменений таблицы.
+    """
+    with open(log_path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # недописанная при сбое строка - дальше журнал не читаем
+                return
+
+def _replay_log(table_data, log_path):
+    """
+    Накатывает журнал изменений поверх снимка таблицы.
+    """
+    # dict по ID сохраняет порядок вставки
+    rows = {row["ID"]: row for row in table_data}
+
+    for record in _log_records(log_path):
+        match record["op"]:
+            case "insert" | "update":
+                rows[record["row"]["ID"]] = record["row"]
+            case "insert_batch":
+                columns = record["columns"]
+                for values in record["rows"]:
+                    row = dict(zip(columns, values))
+                    rows[row["ID"]] = row
+            case "delete":
+                rows.pop(record["id"], None)
+
+    return list(rows.values())
+
+def _apply_log(table, log_path):
+    """
+    Накатывает журнал изменений на столбцовую таблицу по месту,
+    не собирая словари для кортежей снимка. Порядок кортежей тот же,
+    что у _replay_log.
+    """
+    positions = {row_id: position
+                 for position, row_id in enumerate(table.column_values("ID"))}
+    deleted = set()
+
+    def put(row):
+        position = positions.get(row["ID"])
+        if position is None:
+            positions[row["ID"]] = table.append(row)
+        else:
+            for name in table.names:
+                table.set_value(position, name, row.get(name))
+
+    for record in _log_records(log_path):
+        match record["op"]:
+            case "insert" | "update":
+                put(record["row"])
+            case "insert_batch":
+                columns = record["columns"]
+                rows = [dict(zip(columns, values)) for values in record["rows"]]
+                if positions.keys().isdisjoint([row["ID"] for row in rows]):
+                    # новые кортежи (import) добавляются постолбцово
+                    start = table.extend(rows)
+                    positions.update((row["ID"], start + offset)
+                                     for offset, row in enumerate(rows))
+                else:
+                    for row in rows:
+                        put(row)
+            case "delete":
+                position = positions.pop(record["id"], None)
+                if position is not None:
+                    deleted.add(position)
+
+    if deleted:
+        table.delete(deleted)
+    return table
+
+class TableLoadError(Exception):
+    """Файлы таблицы есть, но прочитать их не удалось."""
 
 def load_table_data(table_name, json_dir):
     """
-    Загружает данные конкретной таблицы из JSON'а.
+    Загружает данные конкретной таблицы из JSON'а (снимок + журнал).
     Возвращает [], если файл не найден.
     """
     filepath = Path(json_dir)/f"{table_name}.json"
+    log_path = _log_path(table_name, json_dir)
 
     try:
-        file = open(filepath, "r", encoding="utf-8")
-        return json.load(file)
+        with open(filepath, "r", encoding="utf-8") as file:
+            table_data = json.load(file)
     except FileNotFoundError:
-        return []
-    except Exception as e:
-        print(f"Ошибка: '{e}'")  # just in case
-        return
+        table_data = []
 
-def save_table_data(table_name, data, json_dir):
+    if log_path.exists():
+        table_data = _replay_log(table_data, log_path)
+
+    return table_data
+
+def load_table(table_name, schema, json_dir, fmt="json"):
     """
-    Сохраняет данные конкретной таблицы в JSON.
+    Загружает таблицу в столбцовом виде.
+    Бинарная таблица без журнала открывается через mmap и читается лениво.
+    Нечитаемые файлы - TableLoadError: пустая таблица вместо них
+    затерла бы данные при следующей записи.
     """
-    # создаем директорию если ее нет
-    Path(json_dir).mkdir(parents=True, exist_ok=True)
-    filepath = Path(json_dir)/f"{table_name}.json"
+    try:
+        return _load_table(table_name, schema, json_dir, fmt)
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+        raise TableLoadError(
+            f"таблица '{table_name}' не прочитана ({e}); изменения таблицы " +
+            "недоступны, пока ее файлы не восстановлены") from e
 
+def _load_table(table_name, schema, json_dir, fmt):
+    if fmt != "binary":
+        rows = load_table_data(table_name, json_dir)
+        return ColumnarTable.from_rows(schema, rows)
+
+    filepath = _snapshot_path(table_name, json_dir, fmt)
+    log_path = _log_path(table_name, json_dir)
+
+    if not filepath.exists():
+        rows = _replay_log([], log_path) if log_path.exists() else []
+        return ColumnarTable.from_rows(schema, rows)
+
+    table = open_binary_table(filepath)
+    if not log_path.exists():
+        return table
+    # журнал накатывается по столбцам на копию снимка в памяти:
+    # без сборки словарей для всех кортежей файла
+    return _apply_log(table.to_columnar(), log_path)
+
+def save_table_data(table_name, data, json_dir, fmt="json"):
+    """
+    Сохраняет данные конкретной таблицы в JSON или бинарный формат.
+    Запись идет во временный файл, который затем подменяет снимок,
+    поэтому сбой посреди записи не портит таблицу.
+    Ошибка записи (OSError) пробрасывается вызывающему.
+    """
+    filepath = _snapshot_path(table_name, json_dir, fmt)
+
+    if fmt == "binary":
+        save_binary_table(filepath, data)
+    else:
+        # по кортежу на строку: json.dumps без indent работает
+        # на C-кодировщике и в разы быстрее json.dump(..., indent=4)
+        with atomic_write(filepath, "snapshot") as file:
+            file.write("[\n")
+            for position, row in enumerate(data):
+                if position:
+                    file.write(",\n")
+                file.write("    " + _row_encoder.encode(row))
+            file.write("\n]\n")
+
+    # снимок содержит все изменения, журнал и снимки
+    # в другом формате больше не нужны
+    _log_path(table_name, json_dir).unlink(missing_ok=True)
+    for other_fmt in TABLE_FORMATS:
+        if other_fmt != fmt:
+            _snapshot_path(table_name, json_dir, other_fmt).unlink(missing_ok=True)
+
+def append_table_log(table_name, records, data, json_dir, fmt="json"):
+    """
+    Дописывает записи об изменениях в журнал таблицы.
+    При разрастании журнала сворачивает его в снимок (компакция).
+    Ошибка дописывания (OSError) пробрасывается вызывающему.
+    """
+    filepath = _snapshot_path(table_name, json_dir, fmt)
+    log_path = _log_path(table_name, json_dir)
+
+    with append_write(log_path, "log") as file:
+        for record in records:
+            file.write(_row_encoder.encode(record) + "\n")
+
+    # компакция, когда журнал стал больше снимка
+    # (без данных в памяти, например при восстановлении, не сворачиваем)
+    snapshot_size = filepath.stat().st_size if filepath.exists() else 0
+    if (data is not None and
+            log_path.stat().st_size > max(snapshot_size, LOG_COMPACT_MIN_BYTES)):
+        try:
+            save_table_data(table_name, data, json_dir, fmt)
+        except OSError as e:
+            # изменения уже в журнале, снимок остался прежним -
+            # свернуть журнал можно и при следующей записи
+            print(f"Ошибка: журнал таблицы '{table_name}' не свернут в снимок: '{e}'")
+
+def delete_table_data(table_name, json_dir):
+    """
+    Удаляет файлы данных таблицы (снимки и журнал).
+    """
+    for fmt in TABLE_FORMATS:
+        _snapshot_path(table_name, json_dir, fmt).unlink(missing_ok=True)
+    _log_path(table_name, json_dir).unlink(missing_ok=True)
+
+def save_transaction(filepath, changes):
+    """
+    Атомарно сохраняет изменения транзакции: пишет во временный файл,
+    делает fsync и подменяет им целевой файл.
+    """
+    with atomic_write(filepath, "transaction") as file:
+        file.write(_row_encoder.encode(changes))
+
+def load_transaction(filepath):
+    """
+    Загружает сохраненные изменения транзакции.
+    Возвращает None, если файла нет.
+    """
     try:
-        file = open(filepath, "w", encoding="utf-8")
-        json.dump(data, file, ensure_ascii=False, indent=4)
-        file.close()
-    except Exception as e:
-        print(f"Ошибка при сохранении: '{e}'")
+        with open(filepath, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def read_import_batches(filepath, batch_size):
+    """
+    Потоково читает кортежи из CSV (с заголовком) или JSON-lines
+    и отдает их пачками по batch_size.
+    """
+    suffix = Path(filepath).suffix.lower()
+    if suffix not in TRANSFER_FORMATS:
+        raise ValueError(f"неподдерживаемый формат файла '{suffix}'. " +
+                         f"Допустимые: {', '.join(TRANSFER_FORMATS)}")
+
+    with open(filepath, "r", newline="", encoding="utf-8") as file:
+        if suffix == ".csv":
+            reader = csv.DictReader(file)
+        else:
+            reader = (json.loads(line) for line in file if line.strip())
+
+        while batch := list(islice(reader, batch_size)):
+            yield batch
+
+def write_export_rows(filepath, rows, columns):
+    """
+    Потоково записывает кортежи в CSV или JSON-lines.
+    Возвращает число записанных кортежей.
+    """
+    suffix = Path(filepath).suffix.lower()
+    if suffix not in TRANSFER_FORMATS:
+        raise ValueError(f"неподдерживаемый формат файла '{suffix}'. " +
+                         f"Допустимые: {', '.join(TRANSFER_FORMATS)}")
+
+    count = 0
+    with open(filepath, "w", newline="", encoding="utf-8") as file:
+        if suffix == ".csv":
+            writer = csv.DictWriter(file, fieldnames=columns)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                file.write(_row_encoder.encode(row) + "\n")
+                count += 1
+    return count
@@ -0,0 +1,109 @@
+import unittest
+
+from primitive_db.parser import (
+    normalize_statement,
+    parse_delete_command,
+    parse_insert_command,
+    parse_select_command,
+    parse_statement,
+    parse_update_command,
+    select_label,
+    statement_cache,
+    where_clause_parser,
+)
+
+
+class NormalizeStatementTest(unittest.TestCase):
+    """Шаблоны команд: числа внутри значений не заменяются."""
+
+    def test_dates_and_times_stay_in_values(self):
+        template, arguments = normalize_statement(
+            "insert into ev values (2024-01-15, 12:30)")
+        self.assertEqual(template, "insert into ev values (2024-01-15, 12:30)")
+        self.assertEqual(arguments, [])
+
+    def test_time_in_set_clause(self):
+        template, arguments = normalize_statement(
+            "update ev set at = 09:45 where ID = 3")
+        self.assertEqual(template, "update ev set at = 09:45 where ID = ?0")
+        self.assertEqual(arguments, [("literal", "3")])
+
+    def test_codes_get_own_templates(self):
+        first, _ = normalize_statement("delete from t where code = A-12")
+        second, _ = normalize_statement("delete from t where code = A-13")
+        self.assertEqual(first, "delete from t where code = A-12")
+        self.assertNotEqual(first, second)
+
+    def test_whole_numbers_and_params_are_replaced(self):
+        template, arguments = normalize_statement(
+            "select from t where x = -5 and y in (1,2, 1.5) and z=?")
+        self.assertEqual(template,
+                         "select from t where x = ?0 and y in (?1,?2, ?3) and z=?4")
+        self.assertEqual(arguments, [("literal", "-5"), ("literal", "1"),
+                                     ("literal", "2"), ("literal", "1.5"),
+                                     ("param", 0)])
+
+
+class ParseStatementTest(unittest.TestCase):
+    """Разбор через кэш шаблонов совпадает с разбором исходного текста."""
+
+    def assert_same_parse(self, command, parser, user_input):
+        self.assertEqual(parse_statement(command, user_input), parser(user_input))
+        # второй раз - из кэша шаблонов
+        self.assertEqual(parse_statement(command, user_input), parser(user_input))
+
+    def test_insert_with_date_and_time(self):
+        self.assert_same_parse("insert", parse_insert_command,
+                               "insert into ev values (2024-01-15, 12:30, 7)")
+
+    def test_update_with_time(self):
+        self.assert_same_parse("update", parse_update_command,
+                               "update ev set at = 09:45 where ID = 3")
+
+    def test_codes_do_not_share_template(self):
+        self.assert_same_parse("delete", parse_delete_command,
+                               "delete from t where code = A-12")
+        self.assert_same_parse("delete", parse_delete_command,
+                               "delete from t where code = A-13")
+
+    def test_numbers_share_template(self):
+        self.assert_same_parse("delete", parse_delete_command,
+                               "delete from t where ID = 101")
+        entries = statement_cache.stats()["entries"]
+        self.assert_same_parse("delete", parse_delete_command,
+                               "delete from t where ID = 102")
+        self.assertEqual(statement_cache.stats()["entries"], entries)
+
+
+class ConditionTextTest(unittest.TestCase):
+    """Текст условия - ключ кэша: разные условия дают разный текст."""
+
+    def test_quotes_inside_string_are_escaped(self):
+        quoted = where_clause_parser("name = 'a\" OR x = \"b'")
+        plain = where_clause_parser('name = "a" OR x = "b"')
+        self.assertNotEqual(str(quoted), str(plain))
+        self.assertNotEqual(quoted, plain)
+
+    def test_same_condition_same_text(self):
+        self.assertEqual(str(where_clause_parser("age=28")),
+                         str(where_clause_parser("age  =  28")))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class OrderByLabelTest(unittest.TestCase):
+    """Заголовок ORDER BY совпадает с заголовком элемента выборки."""
+
+    def check(self, command):
+        _, _, options = parse_select_command(command)
+        labels = [select_label(item) for item in options["columns"]]
+        self.assertIn(options["order_by"][0], labels)
+
+    def test_function_case(self):
+        self.check("select count(*) from t group by a order by COUNT(*)")
+        self.check("select COUNT(*) from t group by a order by count(*)")
+
+    def test_argument_case_and_spaces(self):
+        self.check("select a, sum(Age) from t group by a order by SUM( Age ) desc")